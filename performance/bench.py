@@ -0,0 +1,439 @@
+"""
+Reproducible, headless benchmark suite.
+
+Covers the cases of the notebooks `Concatenate_dict.ipynb` and
+`Concatenate_pandas_DataFrames.ipynb` (and `utils/dicts.py` and
+`utils/frames.py`), plus the graph functions of `playground/graphs.py` and the
+factorial functions of `playground/factorial.py`.
+Each case is timed for several input sizes, the results are saved as JSON, and
+two result files (e.g., before and after a change) can be compared.
+
+Usage
+-----
+$ python performance/bench.py list
+$ python performance/bench.py run -o before.json
+$ python performance/bench.py run --group dicts --group graphs --repeat 7 \
+      --warmup 2 -o after.json
+$ python performance/bench.py run --case dijkstra --sizes 1000 10000
+$ python performance/bench.py compare before.json after.json --threshold 1.1
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+from collections import ChainMap, namedtuple
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'playground'))
+sys.path.insert(0, os.path.join(ROOT, 'utils'))
+
+import dicts  # noqa: E402
+import factorial  # noqa: E402
+import graphs  # noqa: E402
+from graphs_scaling import random_graph  # noqa: E402
+
+
+Case = namedtuple('Case', ['group', 'name', 'fn', 'setup', 'sizes'])
+"""
+Benchmark case: `fn(*setup(size))` is timed for each size in `sizes`.
+"""
+
+CASES = []
+
+
+def case(group, sizes, setup, name=None):
+    """
+    Decorator that registers a function as a benchmark case.
+    """
+    def register(fn):
+        CASES.append(Case(group, name or fn.__name__, fn, setup, tuple(sizes)))
+        return fn
+    return register
+
+
+# ==============================================================================
+# Merging dictionaries (Concatenate_dict.ipynb)
+# ==============================================================================
+
+def dicts_setup(size):
+    """
+    `size` dictionaries with 100 keys each, half of them shared with the next.
+    """
+    return [{kk: ii for kk in range(50 * ii, 50 * ii + 100)}
+            for ii in range(size)]
+
+
+DICT_SIZES = (2, 10, 100, 1000)
+
+
+@case('dicts', DICT_SIZES, dicts_setup)
+def concat_dicts__update(*d):
+    concatenated = {}
+    for dd in d:
+        concatenated.update(dd)
+    return concatenated
+
+
+@case('dicts', DICT_SIZES, dicts_setup)
+def concat_dicts__dict_comprehension(*d):
+    return {kk: vv for dd in d for kk, vv in dd.items()}
+
+
+@case('dicts', DICT_SIZES[:-1], dicts_setup)  # quadratic
+def concat_dicts__concat_items_sum(*d):
+    return dict(sum([list(dd.items()) for dd in d], []))
+
+
+@case('dicts', DICT_SIZES, dicts_setup)
+def concat_dicts__concat_items_chain_from_iterable(*d):
+    return dict(itertools.chain.from_iterable([dd.items() for dd in d]))
+
+
+@case('dicts', DICT_SIZES, dicts_setup)
+def concat_dicts__concat_items_chain(*d):
+    return dict(itertools.chain(*[dd.items() for dd in d]))
+
+
+@case('dicts', DICT_SIZES, dicts_setup)
+def concat_dicts__chainmap(*d):
+    return dict(ChainMap(*d[::-1]))
+
+
+def skewed_dicts_setup(size):
+    """
+    One dictionary with 100 * `size` keys between `size` dictionaries with 10
+    keys each.
+    """
+    small = [{kk: ii for kk in range(5 * ii, 5 * ii + 10)} for ii in range(size)]
+    large = {kk: -1 for kk in range(100 * size)}
+    return small[:size // 2] + [large] + small[size // 2:]
+
+
+for _strategy in ('auto', *dicts.STRATEGIES):
+    for _setup, _suffix in ((dicts_setup, ''), (skewed_dicts_setup, ',skewed')):
+        case('dicts', DICT_SIZES, _setup,
+             name=f'merge_dicts[{_strategy:s}{_suffix:s}]')(
+            lambda *d, strategy=_strategy: dicts.merge_dicts(*d,
+                                                             strategy=strategy))
+case('dicts', DICT_SIZES, dicts_setup, name='merge_dicts_stream')(
+    lambda *d: dicts.merge_dicts_stream(iter(d)))
+
+
+# ==============================================================================
+# Concatenating DataFrames (Concatenate_pandas_DataFrames.ipynb)
+# ==============================================================================
+
+def random_array(seed, size, low, high):
+    import numpy as np
+
+    return np.random.RandomState(seed=seed).randint(low=low, high=high,
+                                                    size=size)
+
+
+def random_df(seed, size, low, high):
+    import pandas as pd
+
+    return pd.DataFrame(random_array(seed, size, low, high))
+
+
+def frames_setup(size):
+    """
+    Number of DataFrames `size`, each with shape (100, 4) (as in the notebook).
+    """
+    import pandas  # noqa: F401 (skip the case if pandas is not installed)
+
+    return size, (10**2, 4), 0, 10
+
+
+FRAME_SIZES = (10, 50, 200)
+
+
+@case('frames', FRAME_SIZES, frames_setup)
+def loop_concat_df(N, size, low, high):
+    import pandas as pd
+
+    df = pd.DataFrame()
+    for ii in range(N):
+        df = pd.concat([df, random_df(ii, size, low, high)])
+    return df
+
+
+@case('frames', FRAME_SIZES, frames_setup)
+def loop_concat_list(N, size, low, high):
+    import pandas as pd
+
+    df_list = []
+    for ii in range(N):
+        df_list.append(random_df(ii, size, low, high))
+    return pd.concat(df_list)
+
+
+def loop_generator(N, size, low, high):
+    for ii in range(N):
+        yield random_df(ii, size, low, high)
+
+
+@case('frames', FRAME_SIZES, frames_setup)
+def generator_concat(N, size, low, high):
+    import pandas as pd
+
+    return pd.concat(loop_generator(N, size, low, high))
+
+
+@case('frames', FRAME_SIZES, frames_setup)
+def accumulate_frames(N, size, low, high):
+    from frames import FrameAccumulator
+
+    return FrameAccumulator().extend(loop_generator(N, size, low, high)).to_frame()
+
+
+@case('frames', FRAME_SIZES, frames_setup)
+def accumulate_arrays(N, size, low, high):
+    from frames import FrameAccumulator
+
+    return FrameAccumulator().extend(random_array(ii, size, low, high)
+                                     for ii in range(N)).to_frame()
+
+
+def frames_rows_setup(size):
+    """
+    50 DataFrames (as in the notebook), each with shape (`size`, 4).
+    """
+    import pandas  # noqa: F401 (skip the case if pandas is not installed)
+
+    return 50, (size, 4), 0, 10
+
+
+for _fn in (loop_concat_df, loop_concat_list, generator_concat,
+            accumulate_frames, accumulate_arrays):
+    case('frames', (10**2, 10**3, 10**4), frames_rows_setup,
+         name=f'{_fn.__name__:s}[rows]')(_fn)
+
+
+# ==============================================================================
+# Graphs (playground/graphs.py)
+# ==============================================================================
+
+def graph_setup(size):
+    return random_graph(size), 'n0'
+
+
+def weighted_graph_setup(size):
+    rng = random.Random(1)
+    graph = {node: {neighbor: rng.randint(1, 10) for neighbor in neighbors}
+             for node, neighbors in random_graph(size).items()}
+    return graph, 'n0'
+
+
+def csr_graph_setup(size):
+    return graphs.CSRGraph.from_lists(random_graph(size)), 'n0'
+
+
+def point_to_point_setup(size):
+    return random_graph(size), 'n0', f'n{size - 1:d}'
+
+
+GRAPH_SIZES = (10**3, 10**4, 10**5)
+
+for _fn in (graphs.bfs, graphs.dfs, graphs.shortest_path_bfs):
+    case('graphs', GRAPH_SIZES, graph_setup)(_fn)
+case('graphs', GRAPH_SIZES, csr_graph_setup, name='bfs[csr]')(graphs.bfs)
+case('graphs', GRAPH_SIZES, weighted_graph_setup)(graphs.dijkstra)
+case('graphs', GRAPH_SIZES, csr_graph_setup)(graphs.bfs_vectorized)
+case('graphs', GRAPH_SIZES, csr_graph_setup,
+     name='bfs_vectorized[direction_optimizing]')(
+    lambda graph, start: graphs.bfs_vectorized(graph, start, True,
+                                               reverse_graph=graph))
+case('graphs', GRAPH_SIZES, point_to_point_setup)(graphs.shortest_path)
+case('graphs', GRAPH_SIZES, point_to_point_setup,
+     name='shortest_path[bidirectional]')(
+    lambda graph, start, end: graphs.shortest_path(graph, start, end,
+                                                   bidirectional=True))
+
+
+# ==============================================================================
+# Factorial (playground/factorial.py)
+# ==============================================================================
+
+def factorial_setup(size):
+    # `factorial` is limited by the recursion limit
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 3000))
+    return (size,)
+
+
+case('factorial', (10**2, 10**3, 2 * 10**3), factorial_setup)(
+    factorial.factorial)
+case('factorial', (10**2, 10**3, 10**4, 10**5), factorial_setup)(
+    factorial.factorial_python)
+case('factorial', (10**2, 10**3, 10**4, 10**5), factorial_setup)(
+    factorial.factorial_fast)
+
+
+# ==============================================================================
+# Runner
+# ==============================================================================
+
+def select_cases(groups=None, names=None):
+    return [c for c in CASES
+            if (not groups or c.group in groups) and
+            (not names or c.name in names)]
+
+
+def time_case(c, size, repeat=5, warmup=1, min_time=0.2):
+    """
+    Timings (seconds per call) of `c.fn` for one size.
+
+    The number of calls per measurement is chosen so that each measurement
+    takes about `min_time` seconds (as `%timeit`).
+    """
+    args = c.setup(size)
+    timer = timeit.Timer(lambda: c.fn(*args))
+    number = 1
+    elapsed = timer.timeit(number=1)
+    if elapsed < min_time:
+        number = max(int(min_time / max(elapsed, 1e-9)), 1)
+    for _ in range(warmup):
+        timer.timeit(number=number)
+    timings = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {'group': c.group,
+            'name': c.name,
+            'size': size,
+            'number': number,
+            'repeat': repeat,
+            'timings': timings,
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'mean': statistics.mean(timings),
+            'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(cases, sizes=None, repeat=5, warmup=1, min_time=0.2, output=None):
+    results = []
+    for c in cases:
+        for size in sizes or c.sizes:
+            try:
+                result = time_case(c, size, repeat=repeat, warmup=warmup,
+                                   min_time=min_time)
+            except ImportError as e:  # optional dependency (e.g., pandas)
+                print(f'{c.group:>10s}  {c.name:<45s} skipped: {e}')
+                break
+            results.append(result)
+            print(f'{c.group:>10s}  {c.name:<45s} size = {size:>8,d}  '
+                  f'median = {1e3 * result["median"]:10.4f} ms  '
+                  f'(min {1e3 * result["min"]:.4f} ms, '
+                  f'{result["number"]:d} x {result["repeat"]:d})')
+
+    report = {'meta': {'timestamp': datetime.now(timezone.utc).isoformat(),
+                       'python': sys.version,
+                       'platform': platform.platform(),
+                       'git_commit': _git_commit(),
+                       'repeat': repeat,
+                       'warmup': warmup},
+              'results': results}
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results saved in {output:s}')
+    return report
+
+
+def compare(old_path, new_path, threshold=1.1, stat='median'):
+    """
+    Compare two result files. A case is a regression if its time increased by
+    more than the factor `threshold`.
+
+    Returns
+    -------
+    bool
+        True if there are no regressions.
+    """
+    with open(old_path) as f:
+        old = {(r['group'], r['name'], r['size']): r
+               for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {(r['group'], r['name'], r['size']): r
+               for r in json.load(f)['results']}
+
+    ok = True
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key][stat] / old[key][stat]
+        if ratio > threshold:
+            status, ok = 'REGRESSION', False
+        elif ratio < 1 / threshold:
+            status = 'faster'
+        else:
+            status = ''
+        group, name, size = key
+        print(f'{group:>10s}  {name:<45s} size = {size:>8,d}  '
+              f'{1e3 * old[key][stat]:10.4f} ms -> '
+              f'{1e3 * new[key][stat]:10.4f} ms  x{ratio:6.2f}  {status:s}')
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f'{key[0]:>10s}  {key[1]:<45s} size = {key[2]:>8,d}  only in '
+              f'{old_path if key in old else new_path:s}')
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='list the benchmark cases')
+
+    parser_run = subparsers.add_parser('run', help='run the benchmarks')
+    parser_run.add_argument('--group', action='append',
+                            help='run only this group (can be repeated)')
+    parser_run.add_argument('--case', action='append',
+                            help='run only this case (can be repeated)')
+    parser_run.add_argument('--sizes', type=int, nargs='+',
+                            help='input sizes (default: per case)')
+    parser_run.add_argument('--repeat', type=int, default=5,
+                            help='number of measurements')
+    parser_run.add_argument('--warmup', type=int, default=1,
+                            help='number of measurements discarded')
+    parser_run.add_argument('--min-time', type=float, default=0.2,
+                            help='approximate time of each measurement (s)')
+    parser_run.add_argument('-o', '--output', help='JSON file of the results')
+
+    parser_compare = subparsers.add_parser(
+        'compare', help='compare two result files')
+    parser_compare.add_argument('old')
+    parser_compare.add_argument('new')
+    parser_compare.add_argument('--threshold', type=float, default=1.1,
+                                help='slowdown factor flagged as regression')
+    parser_compare.add_argument('--stat', default='median',
+                                choices=['min', 'median', 'mean'])
+
+    args = parser.parse_args(argv)
+    if args.command == 'list':
+        for c in CASES:
+            sizes = ', '.join(f'{s:,d}' for s in c.sizes)
+            print(f'{c.group:>10s}  {c.name:<45s} sizes: {sizes:s}')
+        return 0
+    if args.command == 'run':
+        cases = select_cases(args.group, args.case)
+        if not cases:
+            parser.error('no benchmark case selected')
+        run(cases, sizes=args.sizes, repeat=args.repeat, warmup=args.warmup,
+            min_time=args.min_time, output=args.output)
+        return 0
+    return 0 if compare(args.old, args.new, args.threshold, args.stat) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark of the factorial functions in `playground/factorial.py`.
+
+`factorial_fast` and `factorial_parallel` are compared with `factorial`,
+`factorial_tail_rec` and `factorial_python` for n = 10, 100, ..., 10^6 (each
+function only up to the largest n it can handle in a reasonable time), and all
+results are checked against `math.factorial`.
+
+Usage
+-----
+$ python performance/factorial_benchmark.py
+$ python performance/factorial_benchmark.py --max-exp 5 --max-python-exp 4
+"""
+import argparse
+import math
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'playground'))
+
+from factorial import (binomial, factorial, factorial_fast,  # noqa: E402
+                       factorial_parallel, factorial_python, factorial_tail_rec,
+                       factorials)
+
+
+def time_function(fn, *args, repeat: int = 3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = perf_counter()
+        result = fn(*args)
+        best = min(best, perf_counter() - t0)
+    return best, result
+
+
+def main(max_exp: int = 6, max_python_exp: int = 5) -> None:
+    # `factorial` and `factorial_tail_rec` are limited by the recursion limit
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 3000))
+    max_n = {factorial: 2000, factorial_tail_rec: 2000,
+             factorial_python: 10**max_python_exp}
+
+    for exp in range(1, max_exp + 1):
+        n = 10**exp
+        expected = math.factorial(n)
+        for fn in (factorial, factorial_tail_rec, factorial_python,
+                   factorial_fast, factorial_parallel):
+            if n > max_n.get(fn, n):
+                continue
+            repeat = 1 if n >= 10**5 else 3
+            seconds, result = time_function(fn, n, repeat=repeat)
+            assert result == expected, f'{fn.__name__:s}({n:d}) is wrong'
+            print(f'{fn.__name__:>20s}  n = {n:>9,d}  {seconds:10.5f} s')
+
+    # Many small queries (memoized table) and batches
+    ns = list(range(1000)) * 10
+    seconds, result = time_function(factorials, ns)
+    assert result == [math.factorial(n) for n in ns]
+    print(f'{"factorials":>20s}  {len(ns):,d} queries n < 1,000  '
+          f'{seconds:10.5f} s')
+    seconds, result = time_function(binomial, 10**5, 5 * 10**4)
+    assert result == math.comb(10**5, 5 * 10**4)
+    print(f'{"binomial":>20s}  n = {10**5:,d}, k = {5 * 10**4:,d}  '
+          f'{seconds:10.5f} s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--max-exp', type=int, default=6,
+                        help='largest n is 10^MAX_EXP')
+    parser.add_argument('--max-python-exp', type=int, default=5,
+                        help='largest n for `factorial_python` is '
+                             '10^MAX_PYTHON_EXP')
+    args = parser.parse_args()
+    main(args.max_exp, args.max_python_exp)
@@ -0,0 +1,92 @@
+"""
+Regression benchmark: the traversals in `playground/graphs.py` must scale
+(near-)linearly with the size of the graph.
+
+Each function is timed on random sparse graphs with 10^3, ..., 10^6 nodes and
+the time per node of the biggest graph is compared with the smallest one. With
+list-based membership tests (quadratic) the ratio explodes; with set-based
+tests it stays small (some growth is expected from cache misses).
+
+Usage
+-----
+$ python performance/graphs_scaling.py
+$ python performance/graphs_scaling.py --max-exp 5 --max-ratio 8
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'playground'))
+
+from graphs import bfs, dfs, dfs_recursive, shortest_path_bfs  # noqa: E402
+
+
+def random_graph(n_nodes: int, degree: int = 4, seed: int = 0
+                ) -> Dict[str, List[str]]:
+    """
+    Random connected undirected graph: a spanning path plus random edges.
+    """
+    rng = random.Random(seed)
+    labels = [f'n{i:d}' for i in range(n_nodes)]
+    graph = {label: [] for label in labels}
+    edges = [(i, i + 1) for i in range(n_nodes - 1)]
+    edges += [(rng.randrange(n_nodes), rng.randrange(n_nodes))
+              for _ in range(n_nodes * (degree - 2) // 2)]
+    for i, j in edges:
+        graph[labels[i]].append(labels[j])
+        graph[labels[j]].append(labels[i])
+    return graph
+
+
+def time_function(fn, graph: dict, start_node: str, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn(graph, start_node)
+        best = min(best, perf_counter() - t0)
+    return best
+
+
+def main(max_exp: int = 6, max_ratio: float = 10.0) -> bool:
+    functions = (bfs, dfs, dfs_recursive, shortest_path_bfs)
+    # the recursive implementation is bounded by the recursion limit
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 3 * 10**4))
+    max_nodes = {dfs_recursive: 10**4}
+
+    per_node = {fn.__name__: {} for fn in functions}
+    for exp in range(3, max_exp + 1):
+        n_nodes = 10**exp
+        graph = random_graph(n_nodes)
+        for fn in functions:
+            if n_nodes > max_nodes.get(fn, n_nodes):
+                continue
+            seconds = time_function(fn, graph, 'n0')
+            per_node[fn.__name__][n_nodes] = seconds / n_nodes
+            print(f'{fn.__name__:>20s}  n = {n_nodes:>9,d}  '
+                  f'{seconds:9.4f} s  {1e9 * seconds / n_nodes:8.1f} ns/node')
+
+    ok = True
+    for name, timings in per_node.items():
+        sizes = sorted(timings)
+        if len(sizes) < 2:
+            continue
+        ratio = timings[sizes[-1]] / timings[sizes[0]]
+        status = 'OK' if ratio <= max_ratio else 'REGRESSION'
+        ok &= ratio <= max_ratio
+        print(f'{name:>20s}  time/node ratio n={sizes[-1]:,d} vs '
+              f'n={sizes[0]:,d}: {ratio:5.2f}  {status:s}')
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--max-exp', type=int, default=6,
+                        help='biggest graph has 10^MAX_EXP nodes')
+    parser.add_argument('--max-ratio', type=float, default=10.0,
+                        help='maximum allowed growth of the time per node')
+    args = parser.parse_args()
+    sys.exit(0 if main(args.max_exp, args.max_ratio) else 1)
@@ -0,0 +1,170 @@
+"""
+Benchmark of `utils/ipython_history.py` on a synthetic IPython history.
+
+A `history.sqlite` file with the schema of IPython is filled with random code
+lines (sessions of 500 inputs, one session per day). The ad-hoc query of
+`cookbook/ipython/IPython-history.ipynb` (a full-table `LIKE` scan) is compared
+with `HistoryIndex.search`, and the time to build the index and to sync new
+inputs is reported.
+
+Usage
+-----
+$ python performance/ipython_history_benchmark.py
+$ python performance/ipython_history_benchmark.py --rows 5000000 --dir /tmp/hist
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'utils'))
+
+from ipython_history import HistoryIndex  # noqa: E402
+
+SESSION_SIZE = 500
+START = datetime.datetime(2015, 1, 1)
+WORDS = ['df', 'pd', 'np', 'x', 'y', 'data', 'result', 'model', 'values',
+         'groupby', 'merge', 'read_csv', 'to_csv', 'plot', 'mean', 'sum',
+         'fit', 'predict', 'reshape', 'astype', 'apply', 'sort_values']
+
+
+def random_line(rng):
+    words = rng.choices(WORDS, k=4)
+    return (f'{words[0]:s} = {words[1]:s}.{words[2]:s}({words[3]:s}, '
+            f'{rng.randrange(1000):d})')
+
+
+def add_history(path, n_rows, first_session=1, seed=0):
+    """
+    Append `n_rows` random inputs (in new sessions) to the history `path`.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS sessions (session integer '
+                     'primary key autoincrement, start timestamp, end timestamp, '
+                     'num_cmds integer, remark text)')
+        conn.execute('CREATE TABLE IF NOT EXISTS history (session integer, '
+                     'line integer, source text, source_raw text, '
+                     'PRIMARY KEY (session, line))')
+        n_sessions = -(-n_rows // SESSION_SIZE)
+        for session in range(first_session, first_session + n_sessions):
+            start = START + datetime.timedelta(days=session)
+            n_lines = min(SESSION_SIZE, n_rows - (session - first_session) *
+                          SESSION_SIZE)
+            conn.execute('INSERT INTO sessions VALUES (?, ?, ?, ?, ?)',
+                         (session, str(start),
+                          str(start + datetime.timedelta(hours=1)), n_lines, ''))
+            lines = [random_line(rng) for _ in range(n_lines)]
+            conn.executemany('INSERT INTO history VALUES (?, ?, ?, ?)',
+                             [(session, line, source, source)
+                              for line, source in enumerate(lines, 1)])
+    conn.close()
+    return first_session + n_sessions
+
+
+def timed(label, fn, *args, **kwargs):
+    t0 = perf_counter()
+    result = fn(*args, **kwargs)
+    print(f'{label:<55s} {perf_counter() - t0:10.4f} s')
+    return result
+
+
+def adhoc_search(path, pattern, limit):
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT session, line, source_raw FROM history '
+                        'WHERE source_raw LIKE ? '
+                        'ORDER BY session DESC, line DESC LIMIT ?',
+                        (f'%{pattern:s}%', limit)).fetchall()
+    conn.close()
+    return rows
+
+
+def check_interleaved_sessions(directory=None):
+    """
+    Inputs of a session that is still running are indexed after a later
+    session was indexed (two IPython sessions open at the same time).
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        history_path = os.path.join(tmp_dir, 'history.sqlite')
+        add_history(history_path, 2 * SESSION_SIZE)
+        conn = sqlite3.connect(history_path)
+        with conn:
+            conn.execute("UPDATE sessions SET end = NULL WHERE session = 1")
+        index = HistoryIndex(history_path, index_path=':memory:')
+        assert index.sync() == 2 * SESSION_SIZE
+        with conn:
+            conn.execute("INSERT INTO history VALUES "
+                         "(1, ?, 'df.groupby_foo', 'df.groupby_foo')",
+                         (SESSION_SIZE + 1,))
+            conn.execute("INSERT INTO history VALUES "
+                         "(2, ?, 'df.groupby_bar', 'df.groupby_bar')",
+                         (SESSION_SIZE + 1,))
+            conn.execute("UPDATE sessions SET end = start, num_cmds = ? "
+                         "WHERE session = 1", (SESSION_SIZE + 1,))
+        conn.close()
+        assert [(e.session, e.line) for e in index.search('groupby_foo')] == \
+            [(1, SESSION_SIZE + 1)]
+        assert index.sync() == 0
+        assert len(index) == 2 * SESSION_SIZE + 2
+        assert [e.session for e in index.search('groupby_', oldest_first=True)
+                ] == [1, 2]
+        assert index.sessions()[0][2] is not None  # end of session 1 updated
+        start_2 = index.sessions()[1][1]
+        assert [e.session for e in index.search('groupby_', since=start_2)] == [2]
+        assert [e.session for e in index.search('groupby_', until=start_2)] == [1]
+        assert list(index.search('groupby_', session=1, since=start_2)) == []
+        index.close()
+
+
+def main(n_rows=2 * 10**6, directory=None):
+    check_interleaved_sessions(directory)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        history_path = os.path.join(tmp_dir, 'history.sqlite')
+        next_session = timed(f'create history ({n_rows:,d} rows)',
+                             add_history, history_path, n_rows)
+
+        index = HistoryIndex(history_path, auto_sync=False)
+        timed('HistoryIndex.sync (initial)', index.sync)
+        timed('HistoryIndex.sync (no new rows)', index.sync)
+        add_history(history_path, 1000, first_session=next_session, seed=1)
+        n_new = timed('HistoryIndex.sync (1,000 new rows)', index.sync)
+        assert n_new == 1000
+        timed('HistoryIndex.optimize', index.optimize)
+        size = os.path.getsize(index.index_path) / 2**20
+        print(f'{"index size":<55s} {size:10.1f} MB')
+
+        since = START + datetime.timedelta(days=next_session - 30)
+        queries = [('groupby(model', {}),  # frequent
+                   ('= predict.reshape(fit, 999)', {}),  # rare
+                   ('no such code', {}),  # absent
+                   ('groupby(model', {'since': since})]
+        for pattern, kwargs in queries:
+            for limit in (20, None):
+                label = f'"{pattern:s}"' + (' since' if kwargs else '')
+                if not kwargs:
+                    expected = timed(f'ad-hoc LIKE {label:s} limit={limit}',
+                                     adhoc_search, history_path, pattern,
+                                     limit or -1)
+                result = timed(f'search {label:s} limit={limit}',
+                               lambda: list(index.search(pattern, limit=limit,
+                                                         **kwargs)))
+                if not kwargs:  # the trigram search is case-insensitive too
+                    assert ([(e.session, e.line) for e in result] ==
+                            [row[:2] for row in expected])
+        index.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=2 * 10**6,
+                        help='number of inputs in the history')
+    parser.add_argument('--dir', default=None,
+                        help='directory of the temporary files')
+    args = parser.parse_args()
+    main(args.rows, args.dir)
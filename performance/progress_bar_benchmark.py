@@ -0,0 +1,65 @@
+"""
+Micro-benchmark of the overhead of `ProgressBar` (in `utils/utils.py`) per
+`update_bar` + `show_bar` call, in the default mode (rendered at every call) and
+in the low-overhead mode (`min_interval`).
+
+The bar is written to `os.devnull`, so only the cost of the bar is measured.
+
+Usage
+-----
+$ python performance/progress_bar_benchmark.py
+$ python performance/progress_bar_benchmark.py --n-steps 1000000
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'utils'))
+
+from utils import ProgressBar  # noqa: E402
+
+
+def overhead_per_call(n_steps: int, **kwargs) -> float:
+    """
+    Seconds per `update_bar` + `show_bar` call, minus the cost of the loop.
+    """
+    progress_bar = ProgressBar(n_steps=n_steps, message='Running', **kwargs)
+    t0 = perf_counter()
+    for _ in range(n_steps):
+        progress_bar.update_bar()
+        progress_bar.show_bar()
+    seconds = perf_counter() - t0
+
+    t0 = perf_counter()
+    for _ in range(n_steps):
+        pass
+    return (seconds - (perf_counter() - t0)) / n_steps
+
+
+def main(n_steps: int = 10**6) -> None:
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            results = {
+                'default': overhead_per_call(n_steps),
+                'min_interval=0.1': overhead_per_call(n_steps,
+                                                      min_interval=0.1),
+                'min_interval=0.1, show_rate': overhead_per_call(
+                    n_steps, min_interval=0.1, show_rate=True),
+            }
+        finally:
+            sys.stdout = stdout
+
+    for mode, seconds in results.items():
+        print(f'{mode:>30s}  {1e9 * seconds:8.1f} ns/call')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n-steps', type=int, default=10**6,
+                        help='number of calls')
+    args = parser.parse_args()
+    main(args.n_steps)
@@ -1,3 +1,8 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
 def factorial(n: int) -> int:
     """
     Calculate factorial of `n`.
@@ -55,3 +60,195 @@ def factorial_python(n: int) -> int:
             return current_prod
         else:
             n, current_prod = n - 1, current_prod * n
+
+
+def _range_product(lo: int, hi: int) -> int:
+    """
+    Product of the integers in [`lo`, `hi`) by binary splitting: the factors
+    are multiplied in a balanced tree, so the big multiplications have operands
+    of similar size (which Python multiplies with Karatsuba).
+    """
+    if hi - lo <= 16:
+        prod = 1
+        for i in range(lo, hi):
+            prod *= i
+        return prod
+    mid = (lo + hi) // 2
+    return _range_product(lo, mid) * _range_product(mid, hi)
+
+
+def _odd_product(lo: int, hi: int) -> int:
+    """
+    Product of the odd integers in [`lo`, `hi`), where `lo` is odd (binary
+    splitting).
+    """
+    count = (hi - lo) // 2
+    if count <= 16:
+        prod = 1
+        for i in range(lo, hi, 2):
+            prod *= i
+        return prod
+    mid = lo + 2 * (count // 2)
+    return _odd_product(lo, mid) * _odd_product(mid, hi)
+
+
+def factorial_fast(n: int) -> int:
+    """
+    Factorial with binary splitting, for big `n` (tested up to 10^6).
+
+    The factors of 2 are removed and added back at the end with a bit shift, and
+    the odd part is computed as a product of products of odd numbers:
+      n! = 2^(n - popcount(n)) * prod_{i >= 0} odd_part(n >> i)
+    where odd_part(m) is the product of the odd numbers in (m >> 1, m]. This is
+    the same algorithm as `math.factorial`.
+
+    References
+    ----------
+    http://www.luschny.de/math/factorial/binarysplitfact.html
+    """
+    if n < 0:
+        raise ValueError('`n` must be non-negative')
+
+    inner = outer = 1
+    for i in range(n.bit_length() - 1, -1, -1):
+        lower = ((n >> (i + 1)) + 1) | 1  # first odd number > n >> (i + 1)
+        upper = ((n >> i) + 1) | 1  # first odd number > n >> i
+        inner *= _odd_product(lower, upper)
+        outer *= inner
+    return outer << (n - bin(n).count('1'))
+
+
+class FactorialTable(object):
+    """
+    Memoized factorials of small numbers.
+
+    The factorials 0!, ..., `max_n`! are computed incrementally the first time
+    they are needed and kept in memory (about 0.6 MB for the default
+    `max_n`); bigger numbers are computed with `factorial_fast`.
+
+    Examples
+    --------
+    >>> table = FactorialTable(max_n=100)
+    >>> table[5]
+    120
+    """
+
+    def __init__(self, max_n: int = 1024):
+        self.max_n = max_n
+        self._table = [1]
+
+    def __getitem__(self, n: int) -> int:
+        if n < 0:
+            raise ValueError('`n` must be non-negative')
+        if n > self.max_n:
+            return factorial_fast(n)
+        table = self._table
+        for i in range(len(table), n + 1):
+            table.append(table[-1] * i)
+        return table[n]
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+_table = FactorialTable()
+
+
+def factorials(ns) -> list:
+    """
+    Factorials of all numbers in `ns` (in the same order).
+
+    The numbers are sorted, so that each factorial is computed from the previous
+    one and the product of the integers in between.
+    """
+    result = {}
+    prev_n, prev_fact = 0, 1
+    for n in sorted(set(ns)):
+        if n <= _table.max_n:
+            prev_n, prev_fact = n, _table[n]
+        else:
+            prev_fact *= _range_product(prev_n + 1, n + 1)
+            prev_n = n
+        result[n] = prev_fact
+    return [result[n] for n in ns]
+
+
+def binomial(n: int, k: int) -> int:
+    """
+    Binomial coefficient "n choose k" = n! / (k! (n - k)!).
+    """
+    if n < 0 or k < 0:
+        raise ValueError('`n` and `k` must be non-negative')
+    if k > n:
+        return 0
+    k = min(k, n - k)
+    if n <= _table.max_n:
+        return _table[n] // (_table[k] * _table[n - k])
+    return _range_product(n - k + 1, n + 1) // factorial_fast(k)
+
+
+def _balanced_bounds(lo: int, hi: int, n_parts: int) -> list:
+    """
+    Split [`lo`, `hi`) into `n_parts` ranges whose products have about the same
+    number of digits: log(prod_{lo <= i < x} i) = lgamma(x) - lgamma(lo).
+    """
+    total = math.lgamma(hi) - math.lgamma(lo)
+    bounds = [lo]
+    for part in range(1, n_parts):
+        target = math.lgamma(lo) + total * part / n_parts
+        left, right = bounds[-1], hi
+        while left < right:  # first x such that lgamma(x) >= target
+            mid = (left + right) // 2
+            if math.lgamma(mid) < target:
+                left = mid + 1
+            else:
+                right = mid
+        bounds.append(left)
+    bounds.append(hi)
+    return bounds
+
+
+def _tree_product(values: list) -> int:
+    """
+    Multiply the values pairwise in a balanced tree.
+    """
+    while len(values) > 1:
+        pairs = [values[i] * values[i + 1] for i in range(0, len(values) - 1, 2)]
+        if len(values) % 2:
+            pairs.append(values[-1])
+        values = pairs
+    return values[0] if values else 1
+
+
+def factorial_parallel(n: int, workers: int = None, cutoff: int = 50000,
+                       parts_per_worker: int = 4) -> int:
+    """
+    Factorial computed in a pool of processes, for huge `n` (millions).
+
+    The range 1, ..., `n` is split into sub-ranges with products of about the
+    same size, which are computed in parallel with `_range_product` and then
+    combined in a balanced tree.
+
+    Parameters
+    ----------
+    n : int
+        Non-negative integer.
+    workers : int, optional
+        Number of processes (default: number of CPUs).
+    cutoff : int, optional
+        For `n` < `cutoff` or a single worker, use `factorial_fast` in the
+        current process (starting the processes is not worth it).
+    parts_per_worker : int, optional
+        Number of sub-ranges per process, to balance the load.
+    """
+    if n < 0:
+        raise ValueError('`n` must be non-negative')
+    workers = workers or os.cpu_count() or 1
+    if n < max(cutoff, 2) or workers == 1:
+        return factorial_fast(n)
+
+    bounds = _balanced_bounds(2, n + 1, workers * parts_per_worker)
+    bounds = sorted(set(bounds))  # remove empty ranges
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        products = list(executor.map(_range_product, bounds[:-1], bounds[1:]))
+    return _tree_product(products)
@@ -1,5 +1,551 @@
-from typing import Dict, List, Optional, Tuple
-from collections import deque
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from heapq import heappop, heappush
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+class CSRGraph(Mapping):
+    """
+    Graph in compressed sparse row (CSR) format.
+
+    The node labels are interned to the integers 0, ..., n-1 once, and the
+    adjacency lists are stored in contiguous arrays: the neighbors of node `i`
+    are `targets[offsets[i]:offsets[i + 1]]` (with the edge weights in the same
+    positions of `weights`, for weighted graphs).
+
+    The graph behaves as a read-only mapping with the same shape as the dict it
+    was built from (node --> list of neighbors, or node --> {neighbor: weight}),
+    so it can be passed to all the functions in this module. `bfs`, `dfs`,
+    `shortest_path_bfs`, `dijkstra` etc. run directly on the integer
+    representation (see `CSRGraph.indexed`).
+
+    Examples
+    --------
+    >>> g = CSRGraph.from_lists({'A': ['B', 'C'], 'B': ['A'], 'C': []})
+    >>> g['A']
+    ['B', 'C']
+    >>> g = CSRGraph.from_dicts({'A': {'B': 2}, 'B': {}})
+    >>> g['A']
+    {'B': 2}
+
+    References
+    ----------
+    https://en.wikipedia.org/wiki/Sparse_matrix#Compressed_sparse_row_(CSR,_CRS_or_Yale_format)
+    """
+
+    def __init__(self, labels: List[str], offsets: array, targets: array,
+                 weights: Optional[array] = None):
+        assert len(offsets) == len(labels) + 1, \
+            '`offsets` must have one element more than `labels`'
+        assert weights is None or len(weights) == len(targets), \
+            '`weights` and `targets` must have the same length'
+        self.labels = labels
+        self.index = {label: i for i, label in enumerate(labels)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.indexed = _IndexedCSR(offsets, targets, weights)
+        self.path = None  # file of a graph opened by `CSRGraph.load`
+
+    @classmethod
+    def from_lists(cls, graph: Dict[str, List[str]]) -> 'CSRGraph':
+        """
+        Build from the unweighted shape node --> list of neighbors.
+        """
+        return cls._from_adjacency(graph, weighted=False)
+
+    @classmethod
+    def from_dicts(cls, graph: Dict[str, Dict[str, int]]) -> 'CSRGraph':
+        """
+        Build from the weighted shape node --> {neighbor: weight}.
+        """
+        return cls._from_adjacency(graph, weighted=True)
+
+    @classmethod
+    def _from_adjacency(cls, graph, weighted: bool) -> 'CSRGraph':
+        labels = list(graph)
+        index = {label: i for i, label in enumerate(labels)}
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for node in graph:
+            for neighbor in graph[node]:
+                if neighbor not in index:  # node without its own entry
+                    index[neighbor] = len(labels)
+                    labels.append(neighbor)
+                targets.append(index[neighbor])
+            if weighted:
+                weights.extend(graph[node].values())
+            offsets.append(len(targets))
+        # Nodes that only appear as neighbors have no outgoing edges
+        offsets.extend([len(targets)] * (len(labels) + 1 - len(offsets)))
+
+        if weighted:
+            typecode = 'q' if all(isinstance(w, int) for w in weights) else 'd'
+            return cls(labels, offsets, targets, array(typecode, weights))
+        return cls(labels, offsets, targets)
+
+    @property
+    def weighted(self) -> bool:
+        return self.weights is not None
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.targets)
+
+    def __getitem__(self, node: str) -> Union[List[str], Dict[str, int]]:
+        i = self.index[node]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        neighbors = [self.labels[j] for j in self.targets[start:stop]]
+        if self.weighted:
+            return dict(zip(neighbors, self.weights[start:stop]))
+        return neighbors
+
+    def __contains__(self, node) -> bool:
+        return node in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.labels)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __repr__(self) -> str:
+        return (f'{self.__class__.__name__}(n_nodes={len(self):d}, '
+                f'n_edges={self.n_edges:d}, weighted={self.weighted})')
+
+    def to_labels(self, nodes: List[int]) -> List[str]:
+        """
+        Translate a sequence of node indices back to node labels.
+        """
+        labels = self.labels
+        return [labels[i] for i in nodes]
+
+    # Binary file: header, offsets, targets, weights (if weighted) and the node
+    # labels encoded in UTF-8 and separated by null characters. The arrays are
+    # 8-byte integers (or floats for the weights) in the native byte order.
+    _FILE_MAGIC = b'CSRG'
+    _FILE_VERSION = 1
+    _FILE_HEADER = struct.Struct('=4sBBcxqqq')  # magic, version, little-endian,
+    # weights typecode (b'-' if unweighted), n_nodes, n_edges, labels size
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """
+        Write the graph to a binary file that `CSRGraph.load` maps into memory.
+        The node labels must be strings without null characters.
+        """
+        path = os.fspath(path)
+        assert all('\0' not in label for label in self.labels), \
+            'the node labels cannot contain null characters'
+        labels = '\0'.join(self.labels).encode('utf-8')
+        arrays = [_as_array(self.offsets, 'q'), _as_array(self.targets, 'q')]
+        typecode = b'-'
+        if self.weighted:
+            weights_typecode = 'q' if _typecode(self.weights) == 'q' else 'd'
+            arrays.append(_as_array(self.weights, weights_typecode))
+            typecode = weights_typecode.encode()
+        header = self._FILE_HEADER.pack(
+            self._FILE_MAGIC, self._FILE_VERSION, sys.byteorder == 'little',
+            typecode, len(self), self.n_edges, len(labels))
+        # Write a new file and rename it, so processes that mapped the old
+        # file keep reading it
+        tmp_path = f'{path:s}.tmp{os.getpid():d}'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                for arr in arrays:
+                    f.write(memoryview(arr).cast('B'))
+                f.write(labels)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> 'CSRGraph':
+        """
+        Open a file written by `CSRGraph.save`.
+
+        The file is mapped into memory (`mmap`) and the arrays of the graph are
+        zero-copy read-only `memoryview`s of the mapping, so loading does not
+        read the edges (only the node labels are decoded) and all processes
+        that load the same file share its pages in the page cache. Use
+        `numpy.frombuffer(graph.targets, dtype=numpy.int64)` etc. for NumPy
+        views.
+        """
+        path = os.fspath(path)
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = cls._FILE_HEADER
+        if len(buf) < header.size:
+            raise ValueError(f'"{path:s}" is not a graph file')
+        (magic, version, little_endian, typecode, n_nodes, n_edges,
+         labels_size) = header.unpack_from(buf)
+        if magic != cls._FILE_MAGIC:
+            raise ValueError(f'"{path:s}" is not a graph file')
+        if version != cls._FILE_VERSION:
+            raise ValueError(f'unsupported graph file version {version:d}')
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError('the graph file was written with another byte order')
+        weighted = typecode != b'-'
+        sizes = [8 * (n_nodes + 1), 8 * n_edges] + ([8 * n_edges] if weighted
+                                                    else [])
+        if len(buf) != header.size + sum(sizes) + labels_size:
+            raise ValueError(f'"{path:s}" is truncated or corrupted')
+
+        view = memoryview(buf)
+        start = header.size
+        arrays = []
+        for size, code in zip(sizes, ['q', 'q', typecode.decode()]):
+            arrays.append(view[start:start + size].cast(code))
+            start += size
+        labels = (str(view[start:start + labels_size], 'utf-8').split('\0')
+                  if n_nodes else [])
+        graph = cls(labels, *arrays)
+        graph.path = path
+        return graph
+
+
+def _typecode(arr: Union[array, memoryview]) -> str:
+    return arr.typecode if isinstance(arr, array) else arr.format
+
+
+def _as_array(arr: Union[array, memoryview], typecode: str
+              ) -> Union[array, memoryview]:
+    """
+    `arr` if its items are of type `typecode`, otherwise a converted copy.
+    """
+    return arr if _typecode(arr) == typecode else array(typecode, arr)
+
+
+class _IndexedCSR(Mapping):
+    """
+    Integer view of a `CSRGraph`: node index --> neighbor indices (a zero-copy
+    `memoryview` slice of the targets), or node index --> `_WeightedRow` for
+    weighted graphs.
+    """
+
+    def __init__(self, offsets: array, targets: array,
+                 weights: Optional[array] = None):
+        self.offsets = offsets
+        self.targets = memoryview(targets)
+        self.weights = None if weights is None else memoryview(weights)
+
+    def __getitem__(self, node: int):
+        if not 0 <= node < len(self.offsets) - 1:
+            raise KeyError(node)
+        start, stop = self.offsets[node], self.offsets[node + 1]
+        if self.weights is None:
+            return self.targets[start:stop]
+        return _WeightedRow(self.targets[start:stop],
+                            self.weights[start:stop])
+
+    def __contains__(self, node) -> bool:
+        return isinstance(node, int) and 0 <= node < len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self.offsets) - 1))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class _WeightedRow(object):
+    """
+    Neighbors of one node in a weighted `CSRGraph`, with the subset of the dict
+    interface used by the search functions.
+    """
+    __slots__ = ('targets', 'weights')
+
+    def __init__(self, targets: memoryview, weights: memoryview):
+        self.targets = targets
+        self.weights = weights
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.targets, self.weights)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.targets)
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def __getitem__(self, neighbor: int):
+        for target, weight in zip(self.targets, self.weights):
+            if target == neighbor:
+                return weight
+        raise KeyError(neighbor)
+
+
+class ReachabilityIndex(object):
+    """
+    Precomputed answers to "is there a path from `a` to `b`?".
+
+    For undirected graphs, the connected components are kept in a union-find
+    structure (with path halving and union by size), so `reachable(a, b)`
+    compares the representatives of both components.
+
+    For directed graphs, the strongly connected components (SCCs) are found
+    with Tarjan's algorithm and numbered 0, ..., C-1. For each SCC of the
+    condensation (the DAG of SCCs), the set of reachable SCCs is stored as the
+    bits of a Python integer (bit `k` is SCC number `k`), so `reachable(a, b)`
+    is a single bit test. The memory is C^2 / 8 bytes for C SCCs (about 1.2 GB
+    for 10^5 SCCs, but much less for graphs where most nodes are in a few big
+    SCCs), plus O(V + E) for the union-find structure and the edges between
+    SCCs.
+
+    `add_edge` updates the index incrementally: a union for undirected graphs;
+    for directed graphs, the SCCs that reach the new edge's source are found by
+    following the edges between SCCs backwards, stopping at the SCCs that
+    already reach its target, and only their sets are extended (O(C / 64)
+    operations per extended set). The SCCs on a new cycle are merged, and new
+    nodes get new numbers (the numbers of merged SCCs are not reused). Removing
+    edges requires building a new index.
+
+    Parameters
+    ----------
+    graph : dict or CSRGraph
+        Unweighted (node --> list of neighbors) or weighted
+        (node --> {neighbor: distance}) graph.
+    directed : bool, optional
+        Use False for undirected graphs (every edge is stored in both
+        directions), which only need the cheaper union-find structure.
+
+    Examples
+    --------
+    >>> index = ReachabilityIndex(graph, directed=False)
+    >>> index.reachable('A', 'G')
+    False
+    >>> shortest_path(graph, 'A', 'G', reachability=index)  # fails immediately
+    """
+
+    def __init__(self, graph: Union[Dict[str, List[str]],
+                                    Dict[str, Dict[str, int]]],
+                 directed: bool = True):
+        self.directed = directed
+        if isinstance(graph, CSRGraph):
+            self.labels = list(graph.labels)
+            self.ids = dict(graph.index)
+            adjacency = graph.indexed
+        else:
+            self.labels = list(graph)
+            self.ids = {node: i for i, node in enumerate(self.labels)}
+            for neighbors in graph.values():
+                for neighbor in neighbors:
+                    if neighbor not in self.ids:  # node without its own entry
+                        self.ids[neighbor] = len(self.labels)
+                        self.labels.append(neighbor)
+            ids = self.ids
+            adjacency = [[ids[neighbor] for neighbor in graph.get(node, ())]
+                         for node in self.labels]
+        n_nodes = len(self.labels)
+        self._parent = list(range(n_nodes))
+        self._size = [1] * n_nodes
+
+        if not directed:
+            self._reach = None
+            for node in range(n_nodes):
+                for neighbor in adjacency[node]:
+                    self._union(node, neighbor)
+            return
+
+        components, n_components = _strongly_connected_components(adjacency)
+        # The first node of each SCC represents it
+        representative = [-1] * n_components
+        for node, component in enumerate(components):
+            if representative[component] < 0:
+                representative[component] = node
+            else:
+                self._parent[node] = representative[component]
+        for node, component in enumerate(components):
+            if node != representative[component]:
+                self._size[representative[component]] += 1
+        # Representative <--> SCC number (the position of its bit)
+        self._number = {root: c for c, root in enumerate(representative)}
+        self._root = representative
+
+        # The SCCs are numbered in reverse topological order, so the SCCs
+        # reachable from an SCC are complete before it is processed
+        members = [[] for _ in range(n_components)]
+        for node, component in enumerate(components):
+            members[component].append(node)
+        reach = [0] * n_components
+        # SCC number --> nodes of other SCCs with an edge into it
+        self._sources = [[] for _ in range(n_components)]
+        for component in range(n_components):
+            bits = 1 << component
+            for node in members[component]:
+                for neighbor in adjacency[node]:
+                    other = components[neighbor]
+                    if other != component:
+                        bits |= reach[other]
+                        self._sources[other].append(node)
+            reach[component] = bits
+        self._reach = reach
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def n_components(self) -> int:
+        """
+        Number of connected components (undirected) or SCCs (directed).
+        """
+        return sum(1 for i, p in enumerate(self._parent) if i == p)
+
+    def _find(self, node: int) -> int:
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]  # path halving
+            node = parent[node]
+        return node
+
+    def _union(self, node1: int, node2: int) -> int:
+        root1, root2 = self._find(node1), self._find(node2)
+        if root1 == root2:
+            return root1
+        if self._size[root1] < self._size[root2]:
+            root1, root2 = root2, root1
+        self._parent[root2] = root1
+        self._size[root1] += self._size[root2]
+        return root1
+
+    def _add_node(self, node: str) -> int:
+        i = self.ids.get(node)
+        if i is None:
+            i = self.ids[node] = len(self.labels)
+            self.labels.append(node)
+            self._parent.append(i)
+            self._size.append(1)
+            if self.directed:
+                self._number[i] = len(self._reach)
+                self._root.append(i)
+                self._reach.append(1 << len(self._reach))
+                self._sources.append([])
+        return i
+
+    def component(self, node: str) -> str:
+        """
+        Node that represents the component (undirected) or SCC (directed) of
+        `node`.
+        """
+        return self.labels[self._find(self.ids[node])]
+
+    def reachable(self, start_node: str, end_node: str) -> bool:
+        """
+        Whether there is a path from `start_node` to `end_node`.
+        """
+        root1 = self._find(self.ids[start_node])
+        root2 = self._find(self.ids[end_node])
+        if not self.directed:
+            return root1 == root2
+        number = self._number
+        return bool((self._reach[number[root1]] >> number[root2]) & 1)
+
+    def add_edge(self, node: str, neighbor: str) -> None:
+        """
+        Update the index after the edge `node` --> `neighbor` was added to the
+        graph (for undirected graphs, in both directions). New nodes are added
+        to the index.
+        """
+        i, j = self._add_node(node), self._add_node(neighbor)
+        if not self.directed:
+            self._union(i, j)
+            return
+        number, reach, sources = self._number, self._reach, self._sources
+        c1, c2 = number[self._find(i)], number[self._find(j)]
+        if c1 != c2:
+            sources[c2].append(i)
+        if (reach[c1] >> c2) & 1:  # no new paths
+            return
+        # Everything that reaches `node` now reaches what `neighbor` reaches.
+        # The SCCs that already reach `neighbor` (and so do the SCCs that reach
+        # them) are not visited.
+        new_bits = reach[c2]
+        reach[c1] |= new_bits
+        extended = [c1]
+        stack = [c1]
+        while stack:
+            for source in sources[stack.pop()]:
+                other = number[self._find(source)]
+                if not (reach[other] >> c2) & 1:
+                    reach[other] |= new_bits
+                    extended.append(other)
+                    stack.append(other)
+        if (new_bits >> c1) & 1:  # new cycle: merge its SCCs
+            # The SCCs on the cycle reach `node` and are reached by `neighbor`.
+            # Their bits stay set in the sets that reach the cycle (which reach
+            # all of it), but only the bit of `neighbor`'s SCC is tested.
+            cycle = [c for c in extended if (new_bits >> c) & 1]
+            roots = self._root
+            for component in cycle:
+                del number[roots[component]]
+                sources[c2].extend(sources[component])
+                sources[component] = []
+                reach[component] = 0
+            del number[roots[c2]]
+            for component in cycle:
+                self._union(roots[c2], roots[component])
+            roots[c2] = self._find(roots[c2])
+            number[roots[c2]] = c2
+
+
+def _strongly_connected_components(adjacency) -> Tuple[List[int], int]:
+    """
+    Tarjan's algorithm (iterative) on node indices 0, ..., n-1.
+
+    Returns the SCC of each node and the number of SCCs. The SCCs are numbered
+    in reverse topological order of the condensation: all edges between
+    different SCCs go from a higher to a lower number.
+    """
+    n_nodes = len(adjacency)
+    order = [-1] * n_nodes  # order of discovery
+    low = [0] * n_nodes
+    on_stack = [False] * n_nodes
+    components = [-1] * n_nodes
+    stack = []
+    counter = n_components = 0
+
+    for root in range(n_nodes):
+        if order[root] >= 0:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(adjacency[root]))]
+        while work:
+            node, neighbors = work[-1]
+            for neighbor in neighbors:
+                if order[neighbor] < 0:
+                    order[neighbor] = low[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack[neighbor] = True
+                    work.append((neighbor, iter(adjacency[neighbor])))
+                    break
+                if on_stack[neighbor] and order[neighbor] < low[node]:
+                    low[node] = order[neighbor]
+            else:  # all neighbors were visited
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == order[node]:  # `node` is the root of an SCC
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        components[member] = n_components
+                        if member == node:
+                            break
+                    n_components += 1
+
+    return components, n_components
 
 
 def bfs(graph: Dict[str, List[str]], start_node: str) -> List[str]:
@@ -10,13 +556,18 @@ def bfs(graph: Dict[str, List[str]], start_node: str) -> List[str]:
     ----------
     https://en.wikipedia.org/wiki/Breadth-first_search#Pseudocode
     """
+    if isinstance(graph, CSRGraph):
+        return graph.to_labels(bfs(graph.indexed, graph.index[start_node]))
+
     visited = [start_node]
+    seen = {start_node}  # O(1) membership test; `visited` keeps the order
     queue = deque([start_node])
 
     while queue:  # FIFO = first in, first out
         node = queue.popleft()
         for neighbor in graph[node]:
-            if neighbor not in visited:
+            if neighbor not in seen:
+                seen.add(neighbor)
                 visited.append(neighbor)
                 queue.append(neighbor)
 
@@ -31,12 +582,17 @@ def dfs(graph: Dict[str, List[str]], start_node: str) -> List[str]:
     ----------
     https://en.wikipedia.org/wiki/Depth-first_search#Pseudocode
     """
+    if isinstance(graph, CSRGraph):
+        return graph.to_labels(dfs(graph.indexed, graph.index[start_node]))
+
     visited = []
+    seen = set()
     stack = [start_node]
 
     while stack:  # LIFO = last in, first out
         node = stack.pop()
-        if node not in visited:
+        if node not in seen:
+            seen.add(node)
             visited.append(node)
             for neighbor in graph[node]:
                 stack.append(neighbor)
@@ -48,22 +604,119 @@ def dfs_recursive(graph: Dict[str, List[str]], start_node: str) -> List[str]:
     """
     Depth-first search (recursive implementation).
 
+    Notes
+    -----
+    Raises `RecursionError` on deep graphs; `iter_dfs` visits the nodes in the
+    same order without recursion.
+
     References
     ----------
     https://en.wikipedia.org/wiki/Depth-first_search#Pseudocode
     """
+    if isinstance(graph, CSRGraph):
+        return graph.to_labels(dfs_recursive(graph.indexed,
+                                             graph.index[start_node]))
+
     visited = []
+    seen = set()
 
     def dfs_aux(node: str) -> List[str]:
+        seen.add(node)
         visited.append(node)
         for neighbor in graph[node]:
-            if neighbor not in visited:
+            if neighbor not in seen:
                 dfs_aux(neighbor)
         return visited
 
     return dfs_aux(start_node)
 
 
+def iter_bfs(graph: Dict[str, List[str]], start_node: str,
+             with_info: bool = False) -> Iterator:
+    """
+    Breadth-first search, yielding the nodes as they are visited (same order as
+    `bfs`).
+
+    Parameters
+    ----------
+    graph : dict
+        Node --> list of neighbors.
+    start_node : str
+    with_info : bool, optional
+        If True, yield tuples (node, depth, parent) instead of the nodes, where
+        depth is the number of edges from `start_node` and parent is the node
+        from which it was reached (None for `start_node`).
+    """
+    if isinstance(graph, CSRGraph):
+        labels = graph.labels
+        for item in iter_bfs(graph.indexed, graph.index[start_node], with_info):
+            if with_info:
+                node, depth, parent = item
+                yield (labels[node], depth,
+                       None if parent is None else labels[parent])
+            else:
+                yield labels[item]
+        return
+
+    seen = {start_node}
+    queue = deque([(start_node, 0)])
+    yield (start_node, 0, None) if with_info else start_node
+
+    while queue:
+        node, depth = queue.popleft()
+        for neighbor in graph[node]:
+            if neighbor not in seen:
+                seen.add(neighbor)
+                queue.append((neighbor, depth + 1))
+                yield (neighbor, depth + 1, node) if with_info else neighbor
+
+
+def iter_dfs(graph: Dict[str, List[str]], start_node: str,
+             with_info: bool = False) -> Iterator:
+    """
+    Depth-first search, yielding the nodes as they are visited.
+
+    The visit order is the same as in `dfs_recursive`, but the recursion is
+    replaced by an explicit stack of neighbor iterators, so the depth of the
+    search is not limited by `sys.getrecursionlimit()`.
+
+    Parameters
+    ----------
+    graph : dict
+        Node --> list of neighbors.
+    start_node : str
+    with_info : bool, optional
+        If True, yield tuples (node, depth, parent) instead of the nodes, where
+        depth is the depth in the search tree and parent is the node from which
+        it was reached (None for `start_node`).
+    """
+    if isinstance(graph, CSRGraph):
+        labels = graph.labels
+        for item in iter_dfs(graph.indexed, graph.index[start_node], with_info):
+            if with_info:
+                node, depth, parent = item
+                yield (labels[node], depth,
+                       None if parent is None else labels[parent])
+            else:
+                yield labels[item]
+        return
+
+    seen = {start_node}
+    stack = [(start_node, iter(graph[start_node]))]
+    yield (start_node, 0, None) if with_info else start_node
+
+    while stack:
+        node, neighbors = stack[-1]
+        for neighbor in neighbors:
+            if neighbor not in seen:
+                seen.add(neighbor)
+                yield (neighbor, len(stack), node) if with_info else neighbor
+                stack.append((neighbor, iter(graph[neighbor])))
+                break
+        else:  # all neighbors were visited
+            stack.pop()
+
+
 def build_path(dest_src: Dict[str, str], start_node: str, end_node: str
              ) -> List[str]:
     """
@@ -84,19 +737,33 @@ def build_path(dest_src: Dict[str, str], start_node: str, end_node: str
 
 def shortest_path_bfs(graph: Dict[str, List[str]],
                       start_node: str,
-                      end_node: Optional[str] = None
+                      end_node: Optional[str] = None,
+                      reachability: Optional[ReachabilityIndex] = None
                      ) -> Dict[str, str]:
     """
     Breadth-first search to find the shortest path between 2 nodes in an
     unweighted graph. Special case of Dijkstra's algorithm.
 
     Modification of `bfs` to return the source --> destination nodes and to stop
-    as soon as the end node is found.
+    as soon as the end node is found. With a `reachability` index of the graph,
+    a missing path is detected before the search.
     """
-    if end_node:
+    if (reachability is not None and end_node is not None and
+            not reachability.reachable(start_node, end_node)):
+        raise ValueError('Path was not found.')
+    if isinstance(graph, CSRGraph):
+        if end_node is not None:
+            assert end_node in graph, f'`end_node` "{end_node:s}" not found in the graph'
+            end_node = graph.index[end_node]
+        labels = graph.labels
+        dest_src = shortest_path_bfs(graph.indexed, graph.index[start_node],
+                                     end_node)
+        return {labels[d]: labels[s] for d, s in dest_src.items()}
+
+    if end_node is not None:
         assert end_node in graph, f'`end_node` "{end_node:s}" not found in the graph'
-    
-    visited = [start_node]
+
+    visited = {start_node}
     queue = deque([start_node])
     dest_src = {}
 
@@ -105,70 +772,908 @@ def shortest_path_bfs(graph: Dict[str, List[str]],
         for neighbor in graph[node]:
             if neighbor not in visited:
                 dest_src[neighbor] = node
-                visited.append(neighbor)
+                visited.add(neighbor)
                 queue.append(neighbor)
-            if end_node and (neighbor == end_node):
+            if end_node is not None and (neighbor == end_node):
                 return dest_src
-    if end_node:  # end node was not found
+    if end_node is not None:  # end node was not found
         raise ValueError('Path was not found.')
     else:  # end node was not given
         return dest_src
 
 
-def shortest_path(graph: Dict[str, List[str]], start_node: str, end_node: str
+def shortest_path_bidirectional_bfs(graph: Dict[str, List[str]],
+                                    start_node: str,
+                                    end_node: str,
+                                    reverse_graph: Optional[Dict[str, List[str]]] = None,
+                                    reachability: Optional[ReachabilityIndex] = None
+                                   ) -> Dict[str, str]:
+    """
+    Bidirectional breadth-first search to find the shortest path between 2
+    nodes in an unweighted graph.
+
+    One BFS starts from `start_node` and another one from `end_node` (following
+    the edges backwards), always expanding a whole level of the smaller
+    frontier, until they meet. For a graph with branching factor b and a path of
+    length d, about 2 b^(d/2) nodes are explored instead of b^d.
+
+    Parameters
+    ----------
+    graph : dict
+        Node --> list of neighbors.
+    start_node, end_node : str
+    reverse_graph : dict, optional
+        Node --> list of predecessors. Only necessary for directed graphs; by
+        default the graph is assumed to be undirected (see `reverse_edges`).
+    reachability : ReachabilityIndex, optional
+        If given, a missing path is detected before the search.
+
+    Returns
+    -------
+    dict
+        Destination --> source, with the same meaning as in `shortest_path_bfs`
+        (use `build_path` to get the path).
+    """
+    assert start_node in graph, f'`start_node` "{start_node:s}" not found in the graph'
+    assert end_node in graph, f'`end_node` "{end_node:s}" not found in the graph'
+    if (reachability is not None and
+            not reachability.reachable(start_node, end_node)):
+        raise ValueError('Path was not found.')
+
+    if isinstance(graph, CSRGraph):
+        labels = graph.labels
+        if reverse_graph is not None:
+            if not isinstance(reverse_graph, CSRGraph):
+                reverse_graph = CSRGraph.from_lists(reverse_graph)
+            assert reverse_graph.labels == labels, \
+                '`graph` and `reverse_graph` must have the same nodes in the same order'
+            reverse_graph = reverse_graph.indexed
+        dest_src = shortest_path_bidirectional_bfs(
+            graph.indexed, graph.index[start_node], graph.index[end_node],
+            reverse_graph)
+        return {labels[d]: labels[s] for d, s in dest_src.items()}
+
+    if reverse_graph is None:
+        reverse_graph = graph
+    if start_node == end_node:
+        return {}
+
+    dest_src = {start_node: None}  # forward search: node --> previous node
+    src_dest = {end_node: None}  # backward search: node --> next node
+    dist_fwd = {start_node: 0}
+    dist_bwd = {end_node: 0}
+    frontier_fwd = [start_node]
+    frontier_bwd = [end_node]
+
+    while frontier_fwd and frontier_bwd:
+
+        # Expand the whole level of the smaller frontier
+        forward = len(frontier_fwd) <= len(frontier_bwd)
+        if forward:
+            g, frontier = graph, frontier_fwd
+            parents, dist, other_dist = dest_src, dist_fwd, dist_bwd
+        else:
+            g, frontier = reverse_graph, frontier_bwd
+            parents, dist, other_dist = src_dest, dist_bwd, dist_fwd
+
+        best_len, meeting = float('inf'), None
+        next_frontier = []
+        for node in frontier:
+            for neighbor in g[node]:
+                if neighbor in other_dist:  # the two searches met
+                    length = dist[node] + 1 + other_dist[neighbor]
+                    if length < best_len:
+                        best_len, meeting = length, (node, neighbor)
+                if neighbor not in parents:
+                    parents[neighbor] = node
+                    dist[neighbor] = dist[node] + 1
+                    next_frontier.append(neighbor)
+
+        if meeting is not None:
+            # Join the two halves at the edge where the searches met
+            node, neighbor = meeting
+            if forward:
+                last_fwd, first_bwd = node, neighbor
+            else:
+                last_fwd, first_bwd = neighbor, node
+            path_src = {d: s for d, s in dest_src.items() if s is not None}
+            node, nxt = last_fwd, first_bwd
+            while nxt is not None:
+                path_src[nxt] = node
+                node, nxt = nxt, src_dest[nxt]
+            return path_src
+
+        if forward:
+            frontier_fwd = next_frontier
+        else:
+            frontier_bwd = next_frontier
+
+    raise ValueError('Path was not found.')
+
+
+def reverse_edges(graph: Union[Dict[str, List[str]], Dict[str, Dict[str, int]]]
+                 ) -> Union[Dict[str, List[str]], Dict[str, Dict[str, int]]]:
+    """
+    Reverse the direction of all edges: node --> list of predecessors, or
+    node --> {predecessor: distance} for weighted graphs.
+    """
+    weighted = any(isinstance(d, Mapping) for d in graph.values())
+    if weighted:
+        reverse = {node: {} for node in graph}
+        for node, neighbors in graph.items():
+            for neighbor, length in neighbors.items():
+                reverse.setdefault(neighbor, {})[node] = length
+        return reverse
+
+    reverse = {node: [] for node in graph}
+    for node, neighbors in graph.items():
+        for neighbor in neighbors:
+            reverse.setdefault(neighbor, []).append(node)
+    return reverse
+
+
+def shortest_path(graph: Dict[str, List[str]], start_node: str, end_node: str,
+                  bidirectional: bool = False,
+                  reverse_graph: Optional[Dict[str, List[str]]] = None,
+                  reachability: Optional[ReachabilityIndex] = None
                  ) -> List[str]:
     """
     Find the shortest path between 2 nodes in an unweighted graph.
+
+    With `bidirectional=True`, use `shortest_path_bidirectional_bfs` (and
+    `reverse_graph`, for directed graphs) instead of `shortest_path_bfs`. With
+    a `reachability` index of the graph, a missing path is detected before the
+    search.
     """
-    dest_src = shortest_path_bfs(graph, start_node, end_node)
+    if bidirectional:
+        dest_src = shortest_path_bidirectional_bfs(graph, start_node, end_node,
+                                                   reverse_graph, reachability)
+    else:
+        dest_src = shortest_path_bfs(graph, start_node, end_node, reachability)
     return build_path(dest_src, start_node, end_node)
 
 
+def _expand(np, offsets, targets, nodes):
+    """
+    All edges leaving `nodes` as (sources, targets) arrays (vectorized gather of
+    the CSR rows).
+    """
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    # position of each edge in `targets`: start of its row + rank in the row
+    row_starts = np.cumsum(counts) - counts
+    positions = (np.repeat(starts - row_starts, counts) +
+                 np.arange(total, dtype=np.int64))
+    return np.repeat(nodes, counts), targets[positions]
+
+
+def _reverse_csr(np, offsets, targets):
+    n_nodes = len(offsets) - 1
+    sources = np.repeat(np.arange(n_nodes, dtype=np.int64), np.diff(offsets))
+    order = np.argsort(targets, kind='stable')
+    rev_offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=n_nodes), out=rev_offsets[1:])
+    return rev_offsets, sources[order]
+
+
+def bfs_vectorized(graph: Union[Dict[str, List[str]], CSRGraph],
+                   start_node: str,
+                   direction_optimizing: bool = False,
+                   reverse_graph: Optional[CSRGraph] = None,
+                   as_arrays: bool = False,
+                   alpha: float = 1., beta: float = 24.):
+    """
+    Level-synchronous breadth-first search with NumPy: the frontier is an array
+    of node indices, and each level is expanded at once by gathering the CSR
+    rows of all frontier nodes and masking the visited ones.
+
+    With `direction_optimizing`, a level is expanded "bottom-up" (each unvisited
+    node looks for a parent in the frontier, through the reversed edges) while
+    the frontier has more edges than `alpha` times the in-edges of the
+    unvisited nodes, until the frontier has fewer than n / `beta` nodes [1].
+    This saves work in graphs with a small diameter, where a few levels contain
+    most nodes. The bottom-up step scans all in-edges of the unvisited nodes
+    (there is no early exit per node as in [1]), hence the default `alpha=1`.
+
+    Parameters
+    ----------
+    graph : dict or CSRGraph
+        Unweighted graph (or weighted `CSRGraph`; the weights are ignored).
+        Dicts are converted to a `CSRGraph` first.
+    start_node : str
+    direction_optimizing : bool, optional
+    reverse_graph : CSRGraph, optional
+        Graph with the edges reversed, for the bottom-up steps (for undirected
+        graphs, `graph` itself). It must have the same node labels in the same
+        order. If not given, it is computed, which usually costs more than the
+        direction optimization saves.
+    as_arrays : bool, optional
+        Return NumPy arrays indexed by node index (see `CSRGraph.labels`)
+        instead of dicts.
+
+    Returns
+    -------
+    (dist, dest_src)
+        Number of edges from `start_node` to each reachable node, and
+        destination node --> source node (as in `shortest_path_bfs`; among the
+        nodes of the previous level, the parent may be a different one). With
+        `as_arrays`, the arrays have -1 for unreachable nodes (and for the
+        parent of `start_node`).
+
+    References
+    ----------
+    [1] S. Beamer, K. Asanovic and D. Patterson, "Direction-Optimizing
+        Breadth-First Search", SC 2012.
+    """
+    import numpy as np
+
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_lists(graph)
+    offsets = np.asarray(graph.offsets, dtype=np.int64)
+    targets = np.asarray(graph.targets, dtype=np.int64)
+    n_nodes = len(graph)
+    start = graph.index[start_node]
+
+    dist = np.full(n_nodes, -1, dtype=np.int64)
+    parent = np.full(n_nodes, -1, dtype=np.int64)
+    slot = np.empty(n_nodes, dtype=np.int64)  # to remove duplicated nodes
+    dist[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+
+    if direction_optimizing:
+        if reverse_graph is not None:
+            assert reverse_graph.labels == graph.labels, \
+                '`reverse_graph` must have the same labels as `graph`'
+            rev_offsets = np.asarray(reverse_graph.offsets, dtype=np.int64)
+            rev_targets = np.asarray(reverse_graph.targets, dtype=np.int64)
+        else:
+            rev_offsets, rev_targets = _reverse_csr(np, offsets, targets)
+        out_degree = np.diff(offsets)
+        in_degree = np.diff(rev_offsets)
+        unvisited_edges = int(in_degree.sum()) - int(in_degree[start])
+        in_frontier = np.zeros(n_nodes, dtype=bool)
+
+    level = 0
+    bottom_up = False
+    while len(frontier):
+        level += 1
+        if direction_optimizing:
+            frontier_edges = int(out_degree[frontier].sum())
+            if not bottom_up:
+                bottom_up = frontier_edges > alpha * unvisited_edges
+            else:
+                bottom_up = len(frontier) >= n_nodes / beta
+
+        if bottom_up:
+            unvisited = np.flatnonzero(dist < 0)
+            nodes, sources = _expand(np, rev_offsets, rev_targets, unvisited)
+            in_frontier[frontier] = True
+            found = in_frontier[sources]
+            in_frontier[frontier] = False
+            nodes, sources = nodes[found], sources[found]
+        else:
+            sources, nodes = _expand(np, offsets, targets, frontier)
+            new = dist[nodes] < 0
+            sources, nodes = sources[new], nodes[new]
+
+        # keep one edge per discovered node
+        slot[nodes] = np.arange(len(nodes))
+        first = slot[nodes] == np.arange(len(nodes))
+        frontier, sources = nodes[first], sources[first]
+        dist[frontier] = level
+        parent[frontier] = sources
+        if direction_optimizing:
+            unvisited_edges -= int(in_degree[frontier].sum())
+
+    if as_arrays:
+        return dist, parent
+    labels = graph.labels
+    reached = np.flatnonzero(dist >= 0)
+    reached = reached[np.argsort(dist[reached], kind='stable')]  # level order
+    dist_dict = dict(zip([labels[i] for i in reached.tolist()],
+                         dist[reached].tolist()))
+    children = reached[parent[reached] >= 0]
+    dest_src = dict(zip([labels[i] for i in children.tolist()],
+                        [labels[i] for i in parent[children].tolist()]))
+    return dist_dict, dest_src
+
+
 def dict_is_subset(small: dict, large: dict) -> bool:
     small_dict_items = small.items()
     large_dict_items = large.items()
     return all(item in large_dict_items for item in small_dict_items)
 
 
-def dijkstra(graph: Dict[str, Dict[str, int]], start_node: str
+def dijkstra(graph: Dict[str, Dict[str, int]], start_node: str,
+             targets: Optional[Iterable[str]] = None,
+             reachability: Optional[ReachabilityIndex] = None
             ) -> Tuple[Dict[str, int], Dict[str, str]]:
     """
     Use Dijkstra's algorithm to find the shortest path from a starting node.
-    
+
+    The next node is taken from a binary heap. Instead of decreasing the key of
+    a node already in the heap, a new entry is pushed and the outdated entries
+    are skipped when popped (lazy deletion), so the complexity is
+    O((V + E) log V).
+
+    Parameters
+    ----------
+    graph : dict
+        Weighted graph: node --> {neighbor: distance}.
+    start_node : str
+    targets : iterable, optional
+        If given, stop as soon as the shortest distance to all these nodes is
+        known. Only the nodes visited so far (whose distances are final, which
+        include `targets`) are returned; unreachable targets have an infinite
+        distance.
+    reachability : ReachabilityIndex, optional
+        Index of the graph used to exclude the unreachable `targets` before the
+        search (otherwise, the search only stops after visiting all nodes
+        reachable from `start_node`).
+
+    Returns
+    -------
+    dist : dict
+        Node --> shortest distance from `start_node`. Without `targets`, all
+        connected nodes are included (infinite distance if not reachable).
+    dest_src : dict
+        Destination --> source in the shortest paths (see `build_path`).
+
     References
     ----------
-    https://en.wikipedia.org/wiki/Dijkstra%27s_algorithm#Pseudocode
+    https://en.wikipedia.org/wiki/Dijkstra%27s_algorithm#Using_a_priority_queue
     """
     assert start_node in graph, f'`start_node` "{start_node:s}" not found in the graph'
 
-    # Initialize
     inf = float('inf')
-    unvisited_nodes = {n for n, d in graph.items() if d}  # only connected nodes
-    dist = {n: inf for n in unvisited_nodes}
+    unreachable = []
+    if targets is not None and reachability is not None:
+        targets = list(targets)
+        unreachable = [t for t in targets
+                       if not reachability.reachable(start_node, t)]
+        if unreachable:
+            targets = [t for t in targets if reachability.reachable(start_node, t)]
+            if not targets:
+                return {start_node: 0, **{t: inf for t in unreachable}}, {}
+
+    if isinstance(graph, CSRGraph):
+        labels = graph.labels
+        if targets is not None:
+            targets = [graph.index[t] for t in targets]
+        dist, dest_src = dijkstra(graph.indexed, graph.index[start_node],
+                                  targets)
+        dist = {labels[n]: d for n, d in dist.items()}
+        for n in unreachable:
+            dist.setdefault(n, inf)
+        return dist, {labels[d]: labels[s] for d, s in dest_src.items()}
+
+    # Initialize
+    if targets is None:
+        dist = {n: inf for n, d in graph.items() if d}  # only connected nodes
+        remaining = None
+    else:
+        dist = {}
+        remaining = set(targets)
     dist[start_node] = 0
     dest_src = {}
+    visited = set()
+    heap = [(0, start_node)]
 
-    while unvisited_nodes:
+    while heap:
 
-        # Find the unvisited node with smallest distance
-        min_dist = inf
-        for n in unvisited_nodes:
-            d = dist[n]
-            if d < min_dist:
-                node, min_dist = n, d
+        # Unvisited node with smallest distance
+        node_dist, node = heappop(heap)
+        if node in visited:  # outdated entry
+            continue
+        visited.add(node)
 
-        unvisited_nodes.remove(node)
+        if remaining is not None:
+            remaining.discard(node)
+            if not remaining:  # all targets were found
+                # Only the visited nodes: the other distances are tentative
+                dist = {n: dist[n] for n in visited}
+                dest_src = {n: s for n, s in dest_src.items() if n in visited}
+                break
 
         # Update the distances if they are smaller than the current value
         for neighbor, length in graph[node].items():
-            test_path = dist[node] + length
-            if test_path < dist[neighbor]:
+            test_path = node_dist + length
+            if test_path < dist.get(neighbor, inf):
+                dist[neighbor] = test_path
+                dest_src[neighbor] = node
+                heappush(heap, (test_path, neighbor))
+
+    for n in unreachable:
+        dist.setdefault(n, inf)
+    if remaining:  # unreachable targets
+        for n in remaining:
+            dist.setdefault(n, inf)
+
+    return dist, dest_src
+
+
+def dijkstra_update(graph: Dict[str, Dict[str, int]],
+                    start_node: str,
+                    dist: Dict[str, int],
+                    dest_src: Dict[str, str],
+                    changed_edges: Iterable[Tuple[str, str]],
+                    reverse_graph: Optional[Dict[str, Dict[str, int]]] = None
+                   ) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    Repair the result of `dijkstra` after some edges of the graph changed.
+
+    Only the region of the graph affected by the changes is searched again:
+    1. The subtrees of the shortest-path tree hanging from removed or longer
+       edges are invalidated and reconnected through their best incoming edge
+       from the rest of the tree.
+    2. New or shorter edges that improve a distance are relaxed.
+    3. The improvements are propagated as in `dijkstra`.
+
+    Parameters
+    ----------
+    graph : dict
+        Weighted graph (node --> {neighbor: distance}), already containing the
+        changes.
+    start_node : str
+    dist, dest_src : dict
+        Result of `dijkstra(graph, start_node)` before the changes. They are
+        updated in place.
+    changed_edges : iterable
+        Edges (node, neighbor) that were inserted, removed or whose distance
+        changed. For undirected graphs, both directions must be given.
+    reverse_graph : dict, optional
+        Node --> {predecessor: distance}, with the changes. Only necessary for
+        directed graphs; by default the graph is assumed to be undirected (see
+        `reverse_edges`).
+
+    Returns
+    -------
+    dist, dest_src : dict
+        Same as `dijkstra(graph, start_node)` (up to ties between paths with the
+        same length).
+
+    References
+    ----------
+    G. Ramalingam and T. Reps, "An incremental algorithm for a generalization of
+    the shortest-path problem", Journal of Algorithms 21 (1996) 267-305.
+    """
+    if reverse_graph is None:
+        reverse_graph = graph
+    inf = float('inf')
+    changed_edges = list(changed_edges)
+
+    # Removed or longer edges of the shortest-path tree
+    affected = set()
+    for node, neighbor in changed_edges:
+        if dest_src.get(neighbor) == node:
+            length = graph.get(node, {}).get(neighbor)
+            if length is None or dist[node] + length > dist[neighbor]:
+                affected.add(neighbor)
+
+    # Their subtrees: the children of a node are among its neighbors
+    stack = list(affected)
+    while stack:
+        node = stack.pop()
+        for neighbor in graph.get(node, ()):
+            if dest_src.get(neighbor) == node and neighbor not in affected:
+                affected.add(neighbor)
+                stack.append(neighbor)
+    for node in affected:
+        dist[node] = inf
+        del dest_src[node]
+
+    # Reconnect the affected nodes through the rest of the tree
+    heap = []
+    for node in affected:
+        for pred, length in reverse_graph.get(node, {}).items():
+            test_path = dist.get(pred, inf) + length
+            if test_path < dist[node]:
+                dist[node] = test_path
+                dest_src[node] = pred
+        if dist[node] < inf:
+            heappush(heap, (dist[node], node))
+
+    # New or shorter edges
+    for node, neighbor in changed_edges:
+        length = graph.get(node, {}).get(neighbor)
+        if length is None:
+            continue
+        test_path = dist.get(node, inf) + length
+        if test_path < dist.get(neighbor, inf):
+            dist[neighbor] = test_path
+            dest_src[neighbor] = node
+            heappush(heap, (test_path, neighbor))
+
+    # Propagate the changes
+    while heap:
+        node_dist, node = heappop(heap)
+        if node_dist > dist[node]:  # outdated entry
+            continue
+        for neighbor, length in graph[node].items():
+            test_path = node_dist + length
+            if test_path < dist.get(neighbor, inf):
+                dist[neighbor] = test_path
+                dest_src[neighbor] = node
+                heappush(heap, (test_path, neighbor))
+
+    return dist, dest_src
+
+
+def astar(graph: Dict[str, Dict[str, int]], start_node: str, end_node: str,
+          heuristic: Callable[[str], float]
+         ) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    A* search to find the shortest path between 2 nodes in a weighted graph.
+
+    Like `dijkstra`, but the nodes are visited in the order of
+    distance + `heuristic(node)`, which guides the search towards `end_node`.
+
+    Parameters
+    ----------
+    graph : dict
+        Weighted graph: node --> {neighbor: distance}.
+    start_node, end_node : str
+    heuristic : callable
+        Estimate of the distance from a node to `end_node`. It must be
+        admissible (never overestimate the distance) for the result to be the
+        shortest path. `lambda node: 0` is equivalent to Dijkstra's algorithm.
+
+    Returns
+    -------
+    dist : dict
+        Node --> distance from `start_node` (final for the nodes in the path).
+    dest_src : dict
+        Destination --> source (see `build_path`).
+
+    References
+    ----------
+    https://en.wikipedia.org/wiki/A*_search_algorithm#Pseudocode
+    """
+    assert start_node in graph, f'`start_node` "{start_node:s}" not found in the graph'
+    assert end_node in graph, f'`end_node` "{end_node:s}" not found in the graph'
+
+    if isinstance(graph, CSRGraph):
+        labels = graph.labels
+        dist, dest_src = astar(graph.indexed, graph.index[start_node],
+                               graph.index[end_node],
+                               lambda n: heuristic(labels[n]))
+        return ({labels[n]: d for n, d in dist.items()},
+                {labels[d]: labels[s] for d, s in dest_src.items()})
+
+    inf = float('inf')
+    dist = {start_node: 0}
+    dest_src = {}
+    heap = [(heuristic(start_node), 0, start_node)]
+
+    while heap:
+        _, node_dist, node = heappop(heap)
+        if node == end_node:
+            return dist, dest_src
+        if node_dist > dist[node]:  # outdated entry
+            continue
+
+        for neighbor, length in graph[node].items():
+            test_path = node_dist + length
+            if test_path < dist.get(neighbor, inf):
                 dist[neighbor] = test_path
                 dest_src[neighbor] = node
+                heappush(heap,
+                         (test_path + heuristic(neighbor), test_path, neighbor))
+
+    raise ValueError('Path was not found.')
+
 
+def shortest_path_weighted(graph: Dict[str, Dict[str, int]], start_node: str,
+                           end_node: str,
+                           heuristic: Optional[Callable[[str], float]] = None,
+                           reachability: Optional[ReachabilityIndex] = None
+                          ) -> List[str]:
+    """
+    Find the shortest path between 2 nodes in a weighted graph.
+
+    Uses `dijkstra`, stopping as soon as `end_node` is reached, or `astar` if
+    a `heuristic` is given. With a `reachability` index of the graph, a missing
+    path is detected before the search.
+    """
+    assert end_node in graph, f'`end_node` "{end_node:s}" not found in the graph'
+    if (reachability is not None and
+            not reachability.reachable(start_node, end_node)):
+        raise ValueError('Path was not found.')
+    if heuristic is not None:
+        _, dest_src = astar(graph, start_node, end_node, heuristic)
+    else:
+        dist, dest_src = dijkstra(graph, start_node, targets=[end_node])
+        if dist[end_node] == float('inf'):
+            raise ValueError('Path was not found.')
+    return build_path(dest_src, start_node, end_node)
+
+
+def _single_source(graph, start_node, weighted: bool) -> Tuple[Dict, Dict]:
+    """
+    `dijkstra` for weighted graphs; for unweighted graphs `shortest_path_bfs`,
+    with the distances in number of edges.
+    """
+    if weighted:
+        return dijkstra(graph, start_node)
+    dest_src = shortest_path_bfs(graph, start_node)
+    dist = {start_node: 0}
+    for dest, src in dest_src.items():  # parents are found before children
+        dist[dest] = dist[src] + 1
     return dist, dest_src
 
 
+_worker_graph = None  # graph shared by the worker processes
+_worker_shm = []
+
+
+def _init_worker(labels: List[str], buffers: List[Tuple[str, str, int]]) -> None:
+    from multiprocessing.shared_memory import SharedMemory
+
+    global _worker_graph
+    views = []
+    for name, typecode, size in buffers:
+        shm = SharedMemory(name=name)
+        _worker_shm.append(shm)  # keep the memory mapped
+        views.append(shm.buf[:size].cast(typecode))
+    _worker_graph = CSRGraph(labels, *views)
+
+
+def _init_worker_from_file(path: str) -> None:
+    global _worker_graph
+    _worker_graph = CSRGraph.load(path)
+
+
+def _worker_single_source(start_node: str) -> Tuple[str, Dict, Dict]:
+    return (start_node,) + _single_source(_worker_graph, start_node,
+                                         _worker_graph.weighted)
+
+
+def multi_source_shortest_paths(graph: Union[Dict[str, List[str]],
+                                             Dict[str, Dict[str, int]]],
+                                sources: Iterable[str],
+                                workers: Optional[int] = None,
+                                chunksize: int = 1
+                               ) -> Iterator[Tuple[str, Dict, Dict]]:
+    """
+    Shortest paths from many source nodes, computed in a pool of processes.
+
+    The graph is converted to a `CSRGraph` whose arrays are copied once to
+    shared memory, so the worker processes read the same buffers and only the
+    source nodes and the results are sent between processes. A graph opened
+    with `CSRGraph.load` is not copied: each worker maps the same file.
+
+    Parameters
+    ----------
+    graph : dict or CSRGraph
+        Unweighted (node --> list of neighbors) or weighted
+        (node --> {neighbor: distance}) graph.
+    sources : iterable
+        Source nodes.
+    workers : int, optional
+        Number of processes (default: number of CPUs). With 1 worker, the
+        results are computed in the current process.
+    chunksize : int, optional
+        Number of sources sent to a worker at a time.
+
+    Yields
+    ------
+    tuple
+        (source, dist, dest_src) as soon as each source is done (not
+        necessarily in the order of `sources`). The result is the same as
+        `dijkstra(graph, source)` for weighted graphs; for unweighted graphs,
+        `dest_src` is `shortest_path_bfs(graph, source)` and `dist` contains
+        the number of edges to each reachable node.
+    """
+    if not isinstance(graph, CSRGraph):
+        weighted = any(isinstance(d, Mapping) for d in graph.values())
+        graph = (CSRGraph.from_dicts(graph) if weighted
+                 else CSRGraph.from_lists(graph))
+    sources = list(sources)
+    for source in sources:
+        assert source in graph, f'source node "{source:s}" not found in the graph'
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sources) <= 1:
+        for source in sources:
+            yield (source,) + _single_source(graph, source, graph.weighted)
+        return
+
+    # Imported here: `multiprocessing` is slow to import and only needed here
+    from multiprocessing import Pool
+    from multiprocessing.shared_memory import SharedMemory
+
+    if graph.path is not None:  # the workers map the same file
+        with Pool(processes=min(workers, len(sources)),
+                  initializer=_init_worker_from_file,
+                  initargs=(graph.path,)) as pool:
+            yield from pool.imap_unordered(_worker_single_source, sources,
+                                           chunksize=chunksize)
+        return
+
+    arrays = [graph.offsets, graph.targets]
+    if graph.weighted:
+        arrays.append(graph.weights)
+    shms = []
+    try:
+        buffers = []
+        for arr in arrays:
+            data = memoryview(arr).cast('B')
+            shm = SharedMemory(create=True, size=max(data.nbytes, 1))
+            shms.append(shm)
+            shm.buf[:data.nbytes] = data
+            buffers.append((shm.name, _typecode(arr), data.nbytes))
+
+        with Pool(processes=min(workers, len(sources)),
+                  initializer=_init_worker,
+                  initargs=(graph.labels, buffers)) as pool:
+            yield from pool.imap_unordered(_worker_single_source, sources,
+                                           chunksize=chunksize)
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+
+def all_pairs_shortest_paths(graph: Union[Dict[str, List[str]],
+                                          Dict[str, Dict[str, int]]],
+                             workers: Optional[int] = None,
+                             chunksize: int = 1
+                            ) -> Iterator[Tuple[str, Dict, Dict]]:
+    """
+    Shortest paths between all pairs of nodes: `multi_source_shortest_paths`
+    with all nodes as sources.
+    """
+    return multi_source_shortest_paths(graph, list(graph), workers, chunksize)
+
+
+class ShortestPathCache(object):
+    """
+    Cache of shortest-path trees of a graph that changes slowly.
+
+    The result of the search from each source node (`dijkstra` for weighted
+    graphs, `shortest_path_bfs` otherwise) is kept in a least-recently-used
+    cache, and any (start, end) query with a cached start is answered with
+    `build_path`. The graph must be changed only through `add_edge` and
+    `remove_edge`, which invalidate only the cached trees affected by the
+    change.
+
+    Parameters
+    ----------
+    graph : dict
+        Unweighted (node --> list of neighbors) or weighted
+        (node --> {neighbor: distance}) graph. It is modified in place by
+        `add_edge` and `remove_edge`.
+    max_sources : int, optional
+        Maximum number of cached source nodes.
+    max_entries : int, optional
+        Maximum total number of nodes in the cached trees (a bound on the
+        memory used by the cache).
+
+    Examples
+    --------
+    >>> cache = ShortestPathCache({'A': {'B': 1}, 'B': {'C': 1}, 'C': {}})
+    >>> cache.shortest_path('A', 'C')
+    ['A', 'B', 'C']
+    >>> cache.shortest_path('A', 'B')  # served from the tree of 'A'
+    ['A', 'B']
+    >>> cache.hits, cache.misses
+    (1, 1)
+    >>> cache.add_edge('A', 'C', 1)  # invalidates the tree of 'A'
+    """
+
+    def __init__(self, graph: Union[Dict[str, List[str]],
+                                    Dict[str, Dict[str, int]]],
+                 max_sources: int = 128, max_entries: Optional[int] = None):
+        self.graph = graph
+        self.weighted = any(isinstance(d, Mapping) for d in graph.values())
+        self.max_sources = max_sources
+        self.max_entries = max_entries
+        self._trees = OrderedDict()  # source --> (dist, dest_src)
+        self._n_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def __contains__(self, start_node: str) -> bool:
+        return start_node in self._trees
+
+    @property
+    def n_entries(self) -> int:
+        return self._n_entries
+
+    def tree(self, start_node: str) -> Tuple[Dict[str, int], Dict[str, str]]:
+        """
+        Distances and destination --> source map of the shortest paths from
+        `start_node` (see `dijkstra`). The result must not be modified.
+        """
+        tree = self._trees.get(start_node)
+        if tree is not None:
+            self.hits += 1
+            self._trees.move_to_end(start_node)
+            return tree
+
+        self.misses += 1
+        tree = _single_source(self.graph, start_node, self.weighted)
+        self._trees[start_node] = tree
+        self._n_entries += len(tree[0])
+        self._evict()
+        return tree
+
+    def shortest_path(self, start_node: str, end_node: str) -> List[str]:
+        """
+        Find the shortest path between 2 nodes.
+        """
+        assert end_node in self.graph, f'`end_node` "{end_node:s}" not found in the graph'
+        _, dest_src = self.tree(start_node)
+        if end_node != start_node and end_node not in dest_src:
+            raise ValueError('Path was not found.')
+        return build_path(dest_src, start_node, end_node)
+
+    def add_edge(self, node: str, neighbor: str, length: int = 1) -> None:
+        """
+        Add the edge node --> neighbor, or change its length (weighted graphs).
+        """
+        graph = self.graph
+        graph.setdefault(neighbor, {} if self.weighted else [])
+        if self.weighted:
+            previous = graph.setdefault(node, {}).get(neighbor)
+            graph[node][neighbor] = length
+        else:
+            previous = 1 if neighbor in graph.setdefault(node, []) else None
+            if previous is None:
+                graph[node].append(neighbor)
+            length = 1
+
+        if previous is not None and length > previous:  # longer edge
+            self._invalidate(lambda dist, dest_src:
+                             dest_src.get(neighbor) == node)
+        else:  # new or shorter edge
+            inf = float('inf')
+            self._invalidate(lambda dist, dest_src:
+                             dist.get(node, inf) + length < dist.get(neighbor, inf))
+
+    def remove_edge(self, node: str, neighbor: str) -> None:
+        """
+        Remove the edge node --> neighbor.
+        """
+        if self.weighted:
+            del self.graph[node][neighbor]
+        else:
+            self.graph[node].remove(neighbor)
+        self._invalidate(lambda dist, dest_src: dest_src.get(neighbor) == node)
+
+    def clear(self) -> None:
+        self._trees.clear()
+        self._n_entries = 0
+
+    def _invalidate(self, is_affected: Callable[[Dict, Dict], bool]) -> None:
+        """
+        Remove the cached trees for which `is_affected(dist, dest_src)`.
+        """
+        for start_node, tree in list(self._trees.items()):
+            if is_affected(*tree):
+                self._drop(start_node)
+                self.invalidations += 1
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used trees until the limits are respected.
+        """
+        while len(self._trees) > 1 and (
+                len(self._trees) > self.max_sources or
+                (self.max_entries is not None and
+                 self._n_entries > self.max_entries)):
+            self._drop(next(iter(self._trees)))
+
+    def _drop(self, start_node: str) -> None:
+        dist, _ = self._trees.pop(start_node)
+        self._n_entries -= len(dist)
+
+
 # ==============================================================================
 # Unit tests
 # ==============================================================================
@@ -214,3 +1719,275 @@ graph_distances = {
 result = dijkstra(graph_distances, 'A')
 expected = ({'A': 0, 'B': 1, 'C': 3, 'D': 4}, {'B': 'A', 'C': 'A', 'D': 'C'})
 assert result == expected
+
+# Same results on the compact representation
+csr = CSRGraph.from_lists(graph)
+assert len(csr) == 7 and csr.n_edges == 12 and not csr.weighted
+assert csr['B'] == ['A', 'D', 'E'] and csr['G'] == []
+assert dict(csr) == graph
+assert bfs(csr, 'A') == bfs(graph, 'A')
+assert dfs(csr, 'A') == dfs(graph, 'A')
+assert dfs_recursive(csr, 'A') == dfs_recursive(graph, 'A')
+assert shortest_path_bfs(csr, 'A', 'F') == shortest_path_bfs(graph, 'A', 'F')
+assert shortest_path_bfs(csr, 'A') == shortest_path_bfs(graph, 'A')
+assert shortest_path(csr, 'A', 'F') == ['A', 'C', 'F']
+
+csr_distances = CSRGraph.from_dicts(graph_distances)
+assert csr_distances.weighted and csr_distances['D'] == {'B': 5, 'C': 1}
+assert dijkstra(csr_distances, 'A') == dijkstra(graph_distances, 'A')
+assert (dijkstra(CSRGraph.from_dicts(graph_distances_uniform), 'A') ==
+        dijkstra(graph_distances_uniform, 'A'))
+
+# Nodes that only appear as neighbors are interned too
+csr = CSRGraph.from_lists({'A': ['B']})
+assert csr.labels == ['A', 'B'] and csr['B'] == [] and bfs(csr, 'A') == ['A', 'B']
+
+# Early exit and point-to-point queries
+dist, dest_src = dijkstra(graph_distances, 'A', targets=['C'])
+assert dist == {'A': 0, 'B': 1, 'C': 3} and dest_src == {'B': 'A', 'C': 'A'}  # D not visited
+assert build_path(dest_src, 'A', 'C') == ['A', 'C']
+assert dijkstra(graph_distances, 'A', targets=['D'])[0]['D'] == 4
+assert shortest_path_weighted(graph_distances, 'A', 'D') == ['A', 'C', 'D']
+assert shortest_path_weighted(csr_distances, 'A', 'D') == ['A', 'C', 'D']
+assert dijkstra({'A': {'B': 1}, 'B': {}, 'C': {'A': 1}}, 'A', targets=['C'])[0]['C'] == float('inf')
+try:
+    shortest_path_weighted({'A': {'B': 1}, 'B': {'A': 1}, 'C': {}}, 'A', 'C')
+    raise AssertionError('`ValueError` not raised')
+except ValueError:
+    pass
+
+# Bidirectional search
+assert shortest_path(graph, 'A', 'F', bidirectional=True) == ['A', 'C', 'F']
+assert shortest_path(graph, 'D', 'F', bidirectional=True) == ['D', 'B', 'E', 'F']
+assert shortest_path(graph, 'A', 'A', bidirectional=True) == []
+assert shortest_path(CSRGraph.from_lists(graph), 'D', 'F', bidirectional=True) == ['D', 'B', 'E', 'F']
+graph_directed = {'A': ['B'], 'B': ['C'], 'C': ['D'], 'D': [], 'E': ['A']}
+assert reverse_edges(graph_directed) == {'A': ['E'], 'B': ['A'], 'C': ['B'], 'D': ['C'], 'E': []}
+assert shortest_path(graph_directed, 'E', 'D', bidirectional=True,
+                     reverse_graph=reverse_edges(graph_directed)) == ['E', 'A', 'B', 'C', 'D']
+assert (shortest_path(CSRGraph.from_lists(graph_directed), 'E', 'D', bidirectional=True,
+                      reverse_graph=reverse_edges(graph_directed)) == ['E', 'A', 'B', 'C', 'D'])
+try:
+    shortest_path(graph, 'A', 'G', bidirectional=True)
+    raise AssertionError('`ValueError` not raised')
+except ValueError:
+    pass
+
+
+def _check_astar() -> None:
+    """
+    A* search with heuristics (`astar`, `shortest_path_weighted`).
+    """
+    assert shortest_path_weighted(graph_distances, 'A', 'D', heuristic=lambda n: 0) == ['A', 'C', 'D']
+    heuristic = {'A': 4, 'B': 5, 'C': 1, 'D': 0}.get  # exact distances to D
+    assert shortest_path_weighted(graph_distances, 'A', 'D', heuristic=heuristic) == ['A', 'C', 'D']
+    assert shortest_path_weighted(csr_distances, 'A', 'D', heuristic=heuristic) == ['A', 'C', 'D']
+    assert astar(graph_distances, 'A', 'D', heuristic)[0]['D'] == 4
+
+
+def _check_multi_source() -> None:
+    """
+    Multiple sources and all pairs in the current process (`workers=1`).
+    """
+    result = {src: (dist, dest_src) for src, dist, dest_src
+              in all_pairs_shortest_paths(graph_distances, workers=1)}
+    assert result['A'] == dijkstra(graph_distances, 'A')
+    assert set(result) == set(graph_distances)
+    result = {src: (dist, dest_src) for src, dist, dest_src
+              in multi_source_shortest_paths(graph, ['A', 'G'], workers=1)}
+    assert result['A'] == ({'A': 0, 'B': 1, 'C': 1, 'D': 2, 'E': 2, 'F': 2},
+                           shortest_path_bfs(graph, 'A'))
+    assert result['G'] == ({'G': 0}, {})
+
+
+def _check_generators() -> None:
+    """
+    `iter_bfs` and `iter_dfs`, including a path deeper than the recursion limit.
+    """
+    assert list(iter_bfs(graph, 'A')) == bfs(graph, 'A')
+    assert list(iter_dfs(graph, 'A')) == dfs_recursive(graph, 'A')
+    assert list(iter_dfs(CSRGraph.from_lists(graph), 'A')) == dfs_recursive(graph, 'A')
+    assert list(iter_bfs(graph, 'A', with_info=True))[:4] == [
+        ('A', 0, None), ('B', 1, 'A'), ('C', 1, 'A'), ('D', 2, 'B')]
+    assert list(iter_dfs(graph, 'A', with_info=True)) == [
+        ('A', 0, None), ('B', 1, 'A'), ('D', 2, 'B'), ('E', 2, 'B'), ('F', 3, 'E'),
+        ('C', 4, 'F')]
+    assert (list(iter_bfs(CSRGraph.from_lists(graph), 'A', with_info=True)) ==
+            list(iter_bfs(graph, 'A', with_info=True)))
+    depth = sys.getrecursionlimit() + 10  # deeper than the recursion limit
+    graph_path = {i: [i + 1] for i in range(depth)}
+    graph_path[depth] = []
+    assert sum(1 for _ in iter_dfs(graph_path, 0)) == depth + 1
+
+
+def _check_dijkstra_update() -> None:
+    """
+    Incremental updates of single-source shortest paths (`dijkstra_update`).
+    """
+    graph_dynamic = {k: dict(v) for k, v in graph_distances.items()}
+    dist, dest_src = dijkstra(graph_dynamic, 'A')
+    graph_dynamic['B']['D'] = graph_dynamic['D']['B'] = 1  # shorter edge
+    dijkstra_update(graph_dynamic, 'A', dist, dest_src, [('B', 'D'), ('D', 'B')])
+    assert (dist, dest_src) == dijkstra(graph_dynamic, 'A')
+    assert dest_src['D'] == 'B' and dist['D'] == 2
+    del graph_dynamic['B']['D'], graph_dynamic['D']['B']  # removed edge
+    dijkstra_update(graph_dynamic, 'A', dist, dest_src, [('B', 'D'), ('D', 'B')])
+    assert (dist, dest_src) == dijkstra(graph_dynamic, 'A')
+    graph_dynamic['A']['C'] = graph_dynamic['C']['A'] = 10  # longer edge
+    dijkstra_update(graph_dynamic, 'A', dist, dest_src, [('A', 'C'), ('C', 'A')])
+    assert dist == {'A': 0, 'B': 1, 'C': 10, 'D': 11}
+    assert reverse_edges({'A': {'B': 2}, 'B': {}}) == {'A': {}, 'B': {'A': 2}}
+
+
+def _check_shortest_path_cache() -> None:
+    """
+    `ShortestPathCache`: hits, invalidation after edge changes and eviction.
+    """
+    cache = ShortestPathCache({'A': {'B': 1, 'C': 3}, 'B': {'A': 1, 'D': 6},
+                               'C': {'A': 3, 'D': 1}, 'D': {'B': 6, 'C': 1}})
+    assert cache.shortest_path('A', 'D') == ['A', 'C', 'D']
+    assert cache.shortest_path('A', 'B') == ['A', 'B'] and (cache.hits, cache.misses) == (1, 1)
+    assert cache.shortest_path('B', 'D') == ['B', 'A', 'C', 'D'] and len(cache) == 2
+    cache.add_edge('B', 'D', 4)  # shorter path for 'B' only
+    assert len(cache) == 1 and 'A' in cache and cache.shortest_path('B', 'D') == ['B', 'D']
+    cache.remove_edge('C', 'A')  # not in any tree
+    assert len(cache) == 2
+    cache.add_edge('A', 'D', 2)  # shorter paths for 'A' and 'B'
+    assert len(cache) == 0 and cache.shortest_path('A', 'D') == ['A', 'D']
+    cache.remove_edge('A', 'D')
+    assert cache.shortest_path('A', 'D') == ['A', 'C', 'D']
+    cache.add_edge('A', 'C', 10)  # longer edge in the tree of 'A'
+    assert cache.shortest_path('A', 'D') == ['A', 'B', 'D']
+    assert cache.invalidations == 5
+
+    cache = ShortestPathCache({k: list(v) for k, v in graph.items()}, max_sources=2)
+    for node in 'ABC':
+        cache.shortest_path(node, 'F')
+    assert list(cache._trees) == ['B', 'C']
+    cache.add_edge('A', 'F')
+    assert cache.shortest_path('A', 'F') == ['A', 'F'] and 'C' in cache
+    try:
+        cache.shortest_path('A', 'G')
+        raise AssertionError('`ValueError` not raised')
+    except ValueError:
+        pass
+    cache = ShortestPathCache(graph, max_entries=10)
+    cache.tree('A'), cache.tree('B')
+    assert len(cache) == 1 and cache.n_entries == 6
+
+
+def _check_reachability_index() -> None:
+    """
+    `ReachabilityIndex` (undirected and directed, with incremental edges) and
+    the `reachability` argument of the search functions.
+    """
+    index = ReachabilityIndex(graph, directed=False)
+    assert index.reachable('A', 'F') and not index.reachable('A', 'G')
+    assert index.n_components == 2 and index.component('D') == index.component('F')
+    for bidirectional in (False, True):
+        try:
+            shortest_path(graph, 'A', 'G', bidirectional, reachability=index)
+            raise AssertionError('`ValueError` not raised')
+        except ValueError:
+            pass
+    assert shortest_path(graph, 'A', 'F', reachability=index) == ['A', 'C', 'F']
+    index.add_edge('F', 'G')
+    assert index.reachable('G', 'A') and index.n_components == 1
+
+    index = ReachabilityIndex(CSRGraph.from_lists(graph_directed))
+    assert index.reachable('E', 'D') and not index.reachable('D', 'E')
+    assert index.n_components == 5
+    index.add_edge('D', 'B')  # cycle B --> C --> D --> B
+    assert index.n_components == 3 and index.reachable('D', 'C')
+    assert index.component('B') == index.component('D') != index.component('A')
+    assert not index.reachable('B', 'A')
+    index.add_edge('C', 'X')  # new node
+    assert index.reachable('E', 'X') and not index.reachable('X', 'D')
+
+    graph_weighted = {'A': {'B': 1}, 'B': {'A': 1}, 'C': {'D': 1}, 'D': {}}
+    index = ReachabilityIndex(graph_weighted)
+    assert dijkstra(graph_weighted, 'A', ['B', 'C'], reachability=index) == (
+        {'A': 0, 'B': 1, 'C': float('inf')}, {'B': 'A'})
+    assert dijkstra(graph_weighted, 'A', ['D'], reachability=index) == (
+        {'A': 0, 'D': float('inf')}, {})
+    assert (dijkstra(CSRGraph.from_dicts(graph_weighted), 'A', ['C', 'B'], reachability=index)
+            == ({'A': 0, 'B': 1, 'C': float('inf')}, {'B': 'A'}))
+    try:
+        shortest_path_weighted(graph_weighted, 'A', 'C', reachability=index)
+        raise AssertionError('`ValueError` not raised')
+    except ValueError:
+        pass
+
+
+def _check_file_format() -> None:
+    """
+    Round trip through `CSRGraph.save` and `CSRGraph.load` (writes temporary
+    files, so it only runs as a script).
+    """
+    import tempfile
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'graph.csr')
+        CSRGraph.from_lists(graph).save(path)
+        csr = CSRGraph.load(path)
+        assert csr.path == path and csr.labels == list(graph) and dict(csr) == graph
+        assert bfs(csr, 'A') == bfs(graph, 'A') and dfs(csr, 'A') == dfs(graph, 'A')
+        assert shortest_path(csr, 'D', 'F', bidirectional=True) == ['D', 'B', 'E', 'F']
+        CSRGraph.from_dicts(graph_distances).save(path)  # replaces the file
+        assert dijkstra(CSRGraph.load(path), 'A') == dijkstra(graph_distances, 'A')
+        CSRGraph.from_dicts({'A': {'B': .5}, 'B': {}}).save(path)
+        assert CSRGraph.load(path)['A'] == {'B': .5}
+        CSRGraph.from_lists({}).save(path)
+        assert len(CSRGraph.load(path)) == 0
+        CSRGraph.from_lists(graph).save(Path(path))
+        assert CSRGraph.load(Path(path)).path == path
+        os.mkdir(os.path.join(tmp_dir, 'dir'))
+        try:  # the temporary file is removed if writing fails
+            CSRGraph.from_lists(graph).save(os.path.join(tmp_dir, 'dir'))
+            raise AssertionError('`OSError` not raised')
+        except OSError:
+            assert sorted(os.listdir(tmp_dir)) == ['dir', 'graph.csr']
+        with open(path, 'wb') as f:
+            f.write(b'not a graph')
+        try:
+            CSRGraph.load(path)
+            raise AssertionError('`ValueError` not raised')
+        except ValueError:
+            pass
+        del csr
+
+
+def _check_bfs_vectorized() -> None:
+    """
+    `bfs_vectorized` (requires NumPy, which is not needed to import this
+    module, so it only runs as a script).
+    """
+    for direction_optimizing in (False, True):
+        dist, dest_src = bfs_vectorized(graph, 'A', direction_optimizing)
+        assert dist == {'A': 0, 'B': 1, 'C': 1, 'D': 2, 'E': 2, 'F': 2}
+        assert dest_src == shortest_path_bfs(graph, 'A')
+        assert bfs_vectorized(CSRGraph.from_lists(graph), 'G', direction_optimizing) == ({'G': 0}, {})
+        assert (bfs_vectorized(graph_directed, 'E', direction_optimizing)[0] ==
+                {'E': 0, 'A': 1, 'B': 2, 'C': 3, 'D': 4})
+    dist, dest_src = bfs_vectorized(CSRGraph.from_lists(graph_directed), 'B', True,
+                                    reverse_graph=CSRGraph.from_lists(
+                                        reverse_edges(graph_directed)),
+                                    as_arrays=True)
+    assert dist.tolist() == [-1, 0, 1, 2, -1] and dest_src.tolist() == [-1, -1, 1, 2, -1]
+
+
+if __name__ == '__main__':
+    _check_astar()
+    _check_multi_source()
+    _check_generators()
+    _check_dijkstra_update()
+    _check_shortest_path_cache()
+    _check_reachability_index()
+    _check_file_format()
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print('NumPy is not installed: `bfs_vectorized` was not checked')
+    else:
+        _check_bfs_vectorized()
@@ -1,5 +1,8 @@
 import logging
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler
 from tqdm import tqdm
 from time import sleep
 
@@ -12,7 +15,7 @@ from time import sleep
 
 class TqdmHandler(logging.StreamHandler):
     def __init__(self, **kwargs):
-        super(self.__class__, self).__init__(**kwargs)
+        super().__init__(**kwargs)
 
     def emit(self, record):
         try:
@@ -24,60 +27,280 @@ class TqdmHandler(logging.StreamHandler):
         except:
             self.handleError(record)
 
-# create logger
-logger = logging.getLogger(__name__)
-logger.setLevel(level=logging.DEBUG)
-logger2 = logging.getLogger('my-second-logger')
-logger2.setLevel(level=logging.DEBUG)
-
-# create custom handler
-handler = TqdmHandler(stream=sys.stdout)
-# Only when TqdmHandler(stream=sys.stderr) and tqdm(file=sys.stdout), the
-# progress bar is shown multiple times. It works in all other cases.
-handler.setLevel(level=logging.DEBUG)
-handler2 = logging.StreamHandler(stream=sys.stderr)
-handler2.setLevel(level=logging.DEBUG)
-
-# create formatter and add it to the handler
-fmt = ('[%(asctime)s] %(levelname)-8s : %(processName)s : %(pathname)s : '
-       '%(filename)s : %(name)s : %(funcName)s : %(module)s : '
-       '%(message)s (%(relativeCreated)d ms elapsed)')
-formatter = logging.Formatter(fmt=fmt,
-                              datefmt="%Y-%m-%dT%H:%M:%S%z")
-handler.setFormatter(fmt=formatter)
-handler2.setFormatter(fmt=logging.Formatter(fmt=logging.BASIC_FORMAT))
-
-# add the handler to the logger
-logger.addHandler(handler)
-logger2.addHandler(handler2)
-
-# Default handler
-# logging.basicConfig(stream=sys.stderr, level=logging.DEBUG,
-#                     datefmt="%Y-%m-%dT%H:%M:%S%z")
-# default options:
-# stream=sys.stderr, level=logging.WARNING, format=logging.BASIC_FORMAT
-# logging.BASIC_FORMAT = "%(levelname)s:%(name)s:%(message)s'"
-# datefmt: ISO8601
-
-# Test log messages
-logger.critical('my critical message')
-logger.error('my error message')
-logger.warning('my warning message')
-logger.info('my info message')
-logger.debug('my debug message')
-
-logger2.debug('my debug message in the second logger')
-
-# Test progress bar
-total_size = 5
-for i in tqdm(iterable=range(total_size),
-              file=sys.stdout,
-              ncols=80,
-              unit='it',
-              leave=True,
-              total=total_size,
-              ):
-    sleep(.8)
-    logger.info('message inside the loop')
-    if i == 3:
-        print 1 + 'a'  # test error behavior
+    def emit_batch(self, records):
+        """
+        Write several records at once: the progress bars are cleared and
+        redrawn only once for the whole batch.
+        """
+        msgs = []
+        for record in records:
+            if record.levelno < self.level or not self.filter(record):
+                continue
+            try:
+                msgs.append(self.format(record))
+            except (KeyboardInterrupt, SystemExit):
+                raise
+            except:
+                self.handleError(record)
+        if not msgs:
+            return
+        try:
+            with self.lock, tqdm.external_write_mode(file=self.stream):
+                self.stream.write('\n'.join(msgs) + self.terminator)
+                self.flush()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(records[-1])
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Put the log records in a bounded queue without blocking the caller (see
+    `BatchingQueueListener`).
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of records in the queue.
+    policy : str
+        What to do when the queue is full:
+        - 'drop_new': discard the new record
+        - 'drop_old': discard the oldest record in the queue
+        - 'block': wait until there is space (never drops records)
+        Records are enqueued under the handler's lock, so producers in several
+        threads do not lose counts or evict records for each other.
+
+    Attributes
+    ----------
+    enqueued, dropped : int
+        Number of records put in the queue and discarded.
+    """
+
+    policies = ('drop_new', 'drop_old', 'block')
+
+    def __init__(self, maxsize=10000, policy='drop_new'):
+        if policy not in self.policies:
+            raise ValueError(f'`policy` must be one of {self.policies}')
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.policy = policy
+        self.enqueued = 0
+        self.dropped = 0
+
+    def enqueue(self, record):
+        # `Handler.handle` already calls `emit` with the handler's (reentrant)
+        # lock; taking it here too keeps the counters and the 'drop_old'
+        # eviction and retry consistent if `enqueue` is called directly
+        with self.lock:
+            if self.policy == 'block':
+                self.queue.put(record)
+                self.enqueued += 1
+                return
+            while True:
+                try:
+                    self.queue.put_nowait(record)
+                    self.enqueued += 1
+                    return
+                except queue.Full:
+                    self.dropped += 1
+                    if self.policy == 'drop_new':
+                        return
+                    try:  # 'drop_old'
+                        self.queue.get_nowait()
+                    except queue.Empty:
+                        pass
+
+
+class BatchingQueueListener(object):
+    """
+    Background thread that takes the records from a queue and writes them in
+    batches with a `TqdmHandler`.
+
+    The listener waits for a record and then takes all records already in the
+    queue (up to `max_batch`), which are written at once with
+    `TqdmHandler.emit_batch`: the terminal is written, flushed and the progress
+    bars are redrawn once per batch instead of once per record.
+
+    Attributes
+    ----------
+    handled, batches : int
+        Number of records and of batches written.
+
+    Examples
+    --------
+    >>> queue_handler = BoundedQueueHandler(maxsize=10000, policy='drop_old')
+    >>> logger.addHandler(queue_handler)
+    >>> listener = BatchingQueueListener(queue_handler.queue,
+                                         TqdmHandler(stream=sys.stdout))
+    >>> listener.start()
+    >>> for i in tqdm(range(10**6)):
+    >>>     logger.debug('iteration %d', i)  # does not wait for the terminal
+    >>> listener.stop()
+    """
+
+    _sentinel = None
+
+    def __init__(self, queue, handler, max_batch=1000, poll_interval=.1):
+        self.queue = queue
+        self.handler = handler
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.handled = 0
+        self.batches = 0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Write the records already in the queue and stop the thread.
+
+        Stopping is signaled with an event, which cannot be lost. The sentinel
+        put in the queue only wakes the thread up: with the 'drop_old' policy it
+        may be evicted, and then the thread notices the event within
+        `poll_interval` seconds.
+        """
+        if self._thread is not None:
+            self._stopping.set()
+            try:
+                self.queue.put_nowait(self._sentinel)
+            except queue.Full:  # the thread is not waiting for records
+                pass
+            self._thread.join()
+            self._thread = None
+
+    def _monitor(self):
+        while not self._stopping.is_set():
+            try:
+                record = self.queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            if record is not self._sentinel:
+                self._drain([record], self.max_batch - 1)
+        # Only the records already in the queue: a thread that keeps logging
+        # would never let it become empty
+        self._drain([], self.queue.qsize())
+
+    def _drain(self, batch, n_max):
+        """
+        Take up to `n_max` more records already in the queue and write them with
+        `batch`, at most `max_batch` records at a time.
+        """
+        for _ in range(n_max):
+            if len(batch) >= self.max_batch:
+                self._emit(batch)
+                batch = []
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not self._sentinel:
+                batch.append(record)
+        if batch:
+            self._emit(batch)
+
+    def _emit(self, batch):
+        self.handler.emit_batch(batch)
+        self.handled += len(batch)
+        self.batches += 1
+
+
+def setup_queue_logging(logger, stream=sys.stdout, formatter=None,
+                        maxsize=10000, policy='drop_new', max_batch=1000):
+    """
+    Add a non-blocking `BoundedQueueHandler` to `logger` and start a
+    `BatchingQueueListener` that writes the records with a `TqdmHandler`.
+
+    Returns
+    -------
+    queue_handler, listener
+        Call `listener.stop()` at the end to write the remaining records.
+    """
+    handler = TqdmHandler(stream=stream)
+    if formatter is not None:
+        handler.setFormatter(fmt=formatter)
+    queue_handler = BoundedQueueHandler(maxsize=maxsize, policy=policy)
+    logger.addHandler(queue_handler)
+    listener = BatchingQueueListener(queue_handler.queue, handler,
+                                     max_batch=max_batch)
+    listener.start()
+    return queue_handler, listener
+
+
+if __name__ == '__main__':
+
+    # create logger
+    logger = logging.getLogger(__name__)
+    logger.setLevel(level=logging.DEBUG)
+    logger2 = logging.getLogger('my-second-logger')
+    logger2.setLevel(level=logging.DEBUG)
+
+    # create custom handler
+    handler = TqdmHandler(stream=sys.stdout)
+    # Only when TqdmHandler(stream=sys.stderr) and tqdm(file=sys.stdout), the
+    # progress bar is shown multiple times. It works in all other cases.
+    handler.setLevel(level=logging.DEBUG)
+    handler2 = logging.StreamHandler(stream=sys.stderr)
+    handler2.setLevel(level=logging.DEBUG)
+
+    # create formatter and add it to the handler
+    fmt = ('[%(asctime)s] %(levelname)-8s : %(processName)s : %(pathname)s : '
+           '%(filename)s : %(name)s : %(funcName)s : %(module)s : '
+           '%(message)s (%(relativeCreated)d ms elapsed)')
+    formatter = logging.Formatter(fmt=fmt,
+                                  datefmt="%Y-%m-%dT%H:%M:%S%z")
+    handler.setFormatter(fmt=formatter)
+    handler2.setFormatter(fmt=logging.Formatter(fmt=logging.BASIC_FORMAT))
+
+    # add the handler to the logger
+    logger.addHandler(handler)
+    logger2.addHandler(handler2)
+
+    # Default handler
+    # logging.basicConfig(stream=sys.stderr, level=logging.DEBUG,
+    #                     datefmt="%Y-%m-%dT%H:%M:%S%z")
+    # default options:
+    # stream=sys.stderr, level=logging.WARNING, format=logging.BASIC_FORMAT
+    # logging.BASIC_FORMAT = "%(levelname)s:%(name)s:%(message)s'"
+    # datefmt: ISO8601
+
+    # Test log messages
+    logger.critical('my critical message')
+    logger.error('my error message')
+    logger.warning('my warning message')
+    logger.info('my info message')
+    logger.debug('my debug message')
+
+    logger2.debug('my debug message in the second logger')
+
+    # Test non-blocking logging inside a fast loop
+    logger3 = logging.getLogger('my-queue-logger')
+    logger3.setLevel(level=logging.DEBUG)
+    queue_handler, listener = setup_queue_logging(logger3, stream=sys.stdout,
+                                                  formatter=formatter,
+                                                  maxsize=1000,
+                                                  policy='drop_old')
+    for i in tqdm(iterable=range(10**4), file=sys.stdout, ncols=80):
+        logger3.debug('message %d inside the fast loop', i)
+    listener.stop()
+    logger.info(f'{queue_handler.enqueued:d} records enqueued, '
+                f'{queue_handler.dropped:d} dropped, '
+                f'{listener.batches:d} batches written')
+
+    # Test progress bar
+    total_size = 5
+    for i in tqdm(iterable=range(total_size),
+                  file=sys.stdout,
+                  ncols=80,
+                  unit='it',
+                  leave=True,
+                  total=total_size,
+                  ):
+        sleep(.8)
+        logger.info('message inside the loop')
+        if i == 3:
+            print(1 + 'a')  # test error behavior
@@ -0,0 +1,323 @@
+import numpy as np
+import pandas as pd
+
+
+class KLLSketch(object):
+    """
+    Approximate quantiles of a stream of numbers with bounded memory.
+
+    The values are kept in a hierarchy of "compactors": level h holds items that
+    represent 2^h values each. When a level exceeds its capacity, it is sorted
+    and every other item (starting at a random offset) is promoted to the next
+    level. The capacity decreases geometrically from the top level (`k` items)
+    downwards, so the memory is O(k) and the rank error is about O(n / k)
+    [1]. While less than `k` values were added, the quantiles are exact.
+
+    Parameters
+    ----------
+    k : int, optional
+        Capacity of the top level (accuracy vs memory).
+    seed : int, optional
+        Seed of the random offsets.
+
+    Examples
+    --------
+    >>> sketch = KLLSketch(k=200, seed=0)
+    >>> for chunk in np.array_split(np.arange(10**6), 100):
+    >>>     sketch.update(chunk)
+    >>> sketch.quantile([.25, .5, .75])
+
+    References
+    ----------
+    [1] Z. Karnin, K. Lang and E. Liberty, "Optimal Quantile Approximation in
+        Streams", FOCS 2016. https://arxiv.org/abs/1603.05346
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(int(np.ceil(self.k * (2/3)**depth)), 2)
+
+    def update(self, values):
+        """
+        Add an array of values (NaN values are ignored).
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """
+        Add all values of another sketch.
+        """
+        for level, items in enumerate(other._levels):
+            if level == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        compressed = True
+        while compressed:
+            compressed = False
+            for level in range(len(self._levels)):
+                items = self._levels[level]
+                if len(items) <= self._capacity(level):
+                    continue
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                # with an odd number of items, the last one stays
+                n_even = len(items) - len(items) % 2
+                offset = self._rng.integers(2)
+                self._levels[level + 1] = np.concatenate(
+                    [self._levels[level + 1], items[offset:n_even:2]])
+                self._levels[level] = items[n_even:]
+                compressed = True
+
+    def _sorted_items(self):
+        """
+        All items in increasing order and their cumulative weights.
+        """
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(items_h), 2.0**h)
+                                  for h, items_h in enumerate(self._levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """
+        Approximate quantile(s) `q` (0 <= `q` <= 1) of the values added so far.
+        """
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        items, cum_weights = self._sorted_items()
+        ranks = np.asarray(q, dtype=float) * cum_weights[-1]
+        idx = np.searchsorted(cum_weights, ranks, side='left')
+        return items[np.clip(idx, 0, len(items) - 1)]
+
+    def smallest_at_least(self, value):
+        """
+        Smallest item kept in the sketch that is >= `value` (NaN if none).
+        """
+        items = np.concatenate(self._levels)
+        items = items[items >= value]
+        return items.min() if len(items) else np.nan
+
+    def largest_at_most(self, value):
+        """
+        Largest item kept in the sketch that is <= `value` (NaN if none).
+        """
+        items = np.concatenate(self._levels)
+        items = items[items <= value]
+        return items.max() if len(items) else np.nan
+
+    @property
+    def nbytes(self):
+        return sum(items.nbytes for items in self._levels)
+
+
+class _GroupStats(object):
+    """
+    Streaming statistics of one group: quantile sketch plus the `max_outliers`
+    smallest and largest values.
+    """
+
+    def __init__(self, k, max_outliers, seed):
+        self.sketch = KLLSketch(k=k, seed=seed)
+        self.max_outliers = max_outliers
+        self.lowest = np.empty(0)
+        self.highest = np.empty(0)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.sketch.update(values)
+        m = self.max_outliers
+        if m == 0:  # only the quantiles (`np.partition` needs m >= 1)
+            return
+        lowest = np.concatenate([self.lowest, values])
+        highest = np.concatenate([self.highest, values])
+        if len(lowest) > m:
+            lowest = np.partition(lowest, m - 1)[:m]
+            highest = np.partition(highest, len(highest) - m)[-m:]
+        self.lowest, self.highest = lowest, highest
+
+    def summary(self, whis):
+        q1, med, q3 = self.sketch.quantile([.25, .5, .75])
+        iqr = q3 - q1
+        low_fence, high_fence = q1 - whis*iqr, q3 + whis*iqr
+
+        # Whiskers: most extreme values inside the fences. They are exact if
+        # they are among the kept lowest/highest values.
+        inside = self.lowest[self.lowest >= low_fence]
+        whisker_min = (inside.min() if len(inside) else
+                       self.sketch.smallest_at_least(low_fence))
+        inside = self.highest[self.highest <= high_fence]
+        whisker_max = (inside.max() if len(inside) else
+                       self.sketch.largest_at_most(high_fence))
+
+        return {'outliers_min': np.sort(self.lowest[self.lowest < whisker_min]),
+                'whisker_min': whisker_min,
+                '25_perc': q1,
+                '50_perc': med,
+                '75_perc': q3,
+                'whisker_max': whisker_max,
+                'outliers_max': np.sort(self.highest[self.highest > whisker_max]),
+                'count': self.sketch.n}
+
+
+class BoxplotStatsBuilder(object):
+    """
+    Build the input of `plots.draw_boxplot` from data that does not fit in
+    memory.
+
+    The values of each group are consumed in chunks. For each group, the
+    quartiles are approximated with a `KLLSketch` and the `max_outliers`
+    smallest and largest values are kept exactly, so the memory does not depend
+    on the number of values.
+
+    Parameters
+    ----------
+    k : int, optional
+        Accuracy of the quantiles (see `KLLSketch`).
+    max_outliers : int, optional
+        Maximum number of outliers kept on each side of each box (the most
+        extreme ones). With 0, no outliers are kept and the whiskers are
+        approximated by the sketch.
+    whis : float, optional
+        The whiskers reach the most extreme values within `whis` times the
+        interquartile range from the box (as in matplotlib's boxplot).
+    seed : int, optional
+        Seed of the sketches.
+
+    Examples
+    --------
+    >>> builder = BoxplotStatsBuilder()
+    >>> for chunk in pd.read_csv('data.csv', chunksize=10**6):
+    >>>     builder.update_frame(chunk, by='group', value='value')
+    >>> draw_boxplot(builder.to_frame())
+
+    >>> df = BoxplotStatsBuilder.from_csv('data.csv', by='group',
+                                          value='value')
+    """
+
+    columns = ['outliers_min', 'whisker_min', '25_perc', '50_perc', '75_perc',
+               'whisker_max', 'outliers_max']
+
+    def __init__(self, k=200, max_outliers=100, whis=1.5, seed=None):
+        if max_outliers < 0:
+            raise ValueError('`max_outliers` must be non-negative')
+        self.k = k
+        self.max_outliers = max_outliers
+        self.whis = whis
+        self.seed = seed
+        self._groups = {}
+
+    def __len__(self):
+        return len(self._groups)
+
+    def update(self, group, values):
+        """
+        Add an array of values of a group.
+        """
+        stats = self._groups.get(group)
+        if stats is None:
+            stats = _GroupStats(self.k, self.max_outliers, self.seed)
+            self._groups[group] = stats
+        stats.update(values)
+
+    def update_frame(self, df, by, value):
+        """
+        Add the values in column `value` of a DataFrame, grouped by the column
+        `by`.
+        """
+        for group, values in df.groupby(by, sort=False)[value]:
+            self.update(group, values.to_numpy())
+
+    def consume(self, chunks, by=None, value=None):
+        """
+        Add all chunks of an iterator: DataFrames (with the columns `by` and
+        `value`) or (group, array of values) pairs.
+        """
+        for chunk in chunks:
+            if isinstance(chunk, pd.DataFrame):
+                self.update_frame(chunk, by, value)
+            else:
+                self.update(*chunk)
+        return self
+
+    def to_frame(self, with_count=False):
+        """
+        DataFrame with one row per group and the columns expected by
+        `plots.draw_boxplot`.
+        """
+        columns = self.columns + ['count'] if with_count else self.columns
+        df = pd.DataFrame([stats.summary(self.whis)
+                           for stats in self._groups.values()],
+                          index=list(self._groups), columns=columns)
+        return df
+
+    @classmethod
+    def from_csv(cls, path, by, value, chunksize=10**6, read_csv_kwargs=None,
+                 **kwargs):
+        """
+        Summary statistics of a CSV file read in chunks with `pd.read_csv`.
+        """
+        read_csv_kwargs = dict(read_csv_kwargs or {}, usecols=[by, value],
+                               chunksize=chunksize)
+        builder = cls(**kwargs)
+        with pd.read_csv(path, **read_csv_kwargs) as reader:
+            builder.consume(reader, by=by, value=value)
+        return builder.to_frame().rename_axis(index=by)
+
+    @classmethod
+    def from_parquet(cls, path, by, value, batch_size=10**6, **kwargs):
+        """
+        Summary statistics of a Parquet file read in batches (requires
+        `pyarrow`).
+        """
+        import pyarrow.parquet as pq
+
+        builder = cls(**kwargs)
+        batches = pq.ParquetFile(path).iter_batches(batch_size=batch_size,
+                                                    columns=[by, value])
+        builder.consume((batch.to_pandas() for batch in batches),
+                        by=by, value=value)
+        return builder.to_frame().rename_axis(index=by)
+
+
+def _check_max_outliers():
+    values = np.r_[np.arange(100.), -100., 500.]
+    for max_outliers in (0, 1, 2, 1000):
+        builder = BoxplotStatsBuilder(max_outliers=max_outliers, seed=0)
+        builder.update('A', values[:50])
+        builder.update('A', values[50:])
+        row = builder.to_frame(with_count=True).loc['A']
+        assert row['count'] == len(values)
+        assert len(row['outliers_min']) == min(max_outliers, 1)
+        assert len(row['outliers_max']) == min(max_outliers, 1)
+        assert row['whisker_min'] <= row['25_perc'] <= row['50_perc']
+        assert row['50_perc'] <= row['75_perc'] <= row['whisker_max']
+    try:
+        BoxplotStatsBuilder(max_outliers=-1)
+        raise AssertionError('`ValueError` not raised')
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    _check_max_outliers()
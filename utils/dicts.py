@@ -0,0 +1,124 @@
+from collections import ChainMap
+from types import MappingProxyType
+
+
+def _merge_update(ds):
+    merged = {}
+    for dd in ds:
+        merged.update(dd)
+    return merged
+
+
+def _merge_chainmap(ds):
+    # the first mappings in a ChainMap have priority
+    return MappingProxyType(ChainMap(*ds[::-1]))
+
+
+def _merge_copy_largest(ds):
+    # Copying a dict is much faster than inserting its items one by one, so
+    # start from a copy of the largest dict. The dicts after it have priority
+    # over it, and the ones before it only add missing keys (the latest first).
+    ii = max(range(len(ds)), key=lambda jj: len(ds[jj]))
+    merged = dict(ds[ii])
+    for dd in ds[ii + 1:]:
+        merged.update(dd)
+    for dd in ds[ii - 1::-1] if ii else ():
+        for kk, vv in dd.items():
+            merged.setdefault(kk, vv)
+    return merged
+
+
+STRATEGIES = {'update': _merge_update,
+              'chainmap': _merge_chainmap,
+              'copy_largest': _merge_copy_largest}
+
+
+def choose_strategy(ds, lazy_threshold=10**6, max_lazy_dicts=8):
+    """
+    Strategy used by `merge_dicts(*ds, strategy='auto')`.
+
+    - 'chainmap' if the dicts have at least `lazy_threshold` items in total and
+      there are at most `max_lazy_dicts` of them (each lookup checks all dicts)
+    - 'copy_largest' if one dict has more than half of all items
+    - 'update' otherwise
+    """
+    sizes = [len(dd) for dd in ds]
+    total = sum(sizes)
+    if (lazy_threshold is not None and total >= lazy_threshold and
+            len(ds) <= max_lazy_dicts):
+        return 'chainmap'
+    if len(ds) > 1 and max(sizes) > total / 2:
+        return 'copy_largest'
+    return 'update'
+
+
+def merge_dicts(*ds, strategy='auto', lazy_threshold=10**6, max_lazy_dicts=8):
+    """
+    Merge dictionaries. For repeated keys, the value of the last dict is used.
+
+    Parameters
+    ----------
+    ds : dict
+        Dictionaries (or any mappings) to merge.
+    strategy : str, optional
+        - 'update': new dict updated with each input (fastest in
+          `performance/Concatenate_dict.ipynb`)
+        - 'chainmap': read-only view of the inputs, no copy. Creating it is
+          O(number of dicts), but each lookup is O(number of dicts), and
+          changes to the inputs are visible in the view.
+        - 'copy_largest': copy of the largest dict (which is faster than
+          inserting its items) merged with the others. The order of the keys
+          may differ from the other strategies.
+        - 'auto': choose based on the number and sizes of the dicts (see
+          `choose_strategy`)
+    lazy_threshold, max_lazy_dicts : int, optional
+        See `choose_strategy`. Use `lazy_threshold=None` to always get a dict.
+
+    Returns
+    -------
+    dict or mappingproxy
+        Merged dictionary (read-only view for 'chainmap').
+
+    Examples
+    --------
+    >>> merge_dicts({'a': 1, 'b': 2}, {'b': 21}, {'x': 3})
+    {'a': 1, 'b': 21, 'x': 3}
+    >>> merge_dicts({'a': 1}, {'a': 2}, strategy='chainmap')['a']
+    2
+    """
+    if strategy == 'auto':
+        strategy = choose_strategy(ds, lazy_threshold=lazy_threshold,
+                                   max_lazy_dicts=max_lazy_dicts)
+    if strategy not in STRATEGIES:
+        raise ValueError(f'`strategy` must be "auto" or one of '
+                         f'{list(STRATEGIES)}, not "{strategy:s}"')
+    if not ds:
+        return {}
+    return STRATEGIES[strategy](ds)
+
+
+def merge_dicts_stream(ds, into=None):
+    """
+    Merge an iterator of dictionaries (e.g., a generator reading them from
+    files) without keeping them in memory: each dict is added to the result and
+    can be discarded before the next one is produced.
+
+    Parameters
+    ----------
+    ds : iterable of dict
+    into : dict, optional
+        Dict updated in place (default: a new dict).
+
+    Returns
+    -------
+    dict
+
+    Examples
+    --------
+    >>> merge_dicts_stream(json.loads(line) for line in open('dicts.jsonl'))
+    """
+    merged = {} if into is None else into
+    update = merged.update
+    for dd in ds:
+        update(dd)
+    return merged
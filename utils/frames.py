@@ -0,0 +1,302 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+class _BlockBuffer(object):
+    """
+    Preallocated 2-D array (rows x columns) for NumPy blocks with the same dtype
+    and number of columns. It grows geometrically, so appending m rows costs
+    O(m) amortized.
+    """
+
+    def __init__(self, dtype, n_cols, capacity, growth):
+        self.dtype = dtype
+        self.n_cols = n_cols
+        self.growth = growth
+        self.n_rows = 0
+        self.block_lengths = []
+        self.array = np.empty((capacity, n_cols), dtype=dtype)
+
+    @property
+    def nbytes(self):
+        # the whole allocated capacity is resident, not only the filled rows
+        return self.array.nbytes
+
+    def append(self, arr):
+        start, stop = self.n_rows, self.n_rows + len(arr)
+        if stop > len(self.array):
+            capacity = max(stop, int(len(self.array) * self.growth) + 1)
+            array = np.empty((capacity, self.n_cols), dtype=self.dtype)
+            array[:start] = self.array[:start]
+            self.array = array
+        self.array[start:stop] = arr
+        self.n_rows = stop
+        self.block_lengths.append(len(arr))
+
+    def to_frame(self, columns, ignore_index):
+        if ignore_index:
+            index = pd.RangeIndex(self.n_rows)
+        else:  # the index of each block is 0, 1, ... (as `pd.DataFrame(arr)`)
+            lengths = np.array(self.block_lengths)
+            starts = np.cumsum(lengths) - lengths
+            index = np.arange(self.n_rows) - np.repeat(starts, lengths)
+        return pd.DataFrame(self.array[:self.n_rows].copy(), index=index,
+                            columns=columns)
+
+
+class FrameAccumulator(object):
+    """
+    Collect many small DataFrames or 2-D NumPy blocks into a single DataFrame
+    without the quadratic cost of calling `pd.concat` in a loop (see
+    `performance/Concatenate_pandas_DataFrames.ipynb`).
+
+    DataFrames are kept in a list and concatenated once. NumPy blocks are copied
+    into a preallocated array that grows geometrically while their dtype and
+    number of columns do not change (a block with another dtype starts a new
+    array), so no DataFrame is created per block.
+
+    If `max_bytes` is given, the data in memory is written to a file in
+    `spill_dir` whenever its size exceeds `max_bytes`. The size of a DataFrame
+    is estimated from the first DataFrame with the same columns, and the NumPy
+    blocks count with the allocated capacity of their arrays (including the
+    rows preallocated by the geometric growth). The spilled
+    chunks are read back by `to_frame` and `iter_chunks`, and deleted by
+    `close` (or at the end of a `with` block).
+
+    Parameters
+    ----------
+    columns : list, optional
+        Column names of the NumPy blocks (default: 0, 1, ...).
+    ignore_index : bool, optional
+        If True, the result has a RangeIndex (as `pd.concat(...,
+        ignore_index=True)`). Otherwise, the index of the DataFrames is kept,
+        and the rows of each NumPy block are numbered from 0 (as
+        `pd.DataFrame(block)`).
+    initial_capacity : int, optional
+        Number of rows preallocated for the NumPy blocks (at least the number of
+        rows of the first block).
+    growth : float, optional
+        Factor by which the preallocated array grows when full.
+    max_bytes : int, optional
+        Memory budget (bytes) of the data kept in memory.
+    spill_dir : str, optional
+        Directory of the temporary spill files (default: system temporary
+        directory).
+    spill_format : {'pickle', 'parquet'}, optional
+        Format of the spill files ('parquet' requires `pyarrow`).
+
+    Examples
+    --------
+    >>> acc = FrameAccumulator()
+    >>> for ii in range(1000):
+    >>>     acc.append(random_array(ii, (100, 4), 0, 10))
+    >>> df = acc.to_frame()
+
+    >>> with FrameAccumulator(max_bytes=2**30, spill_format='parquet') as acc:
+    >>>     acc.extend(read_frames())
+    >>>     for chunk in acc.iter_chunks():
+    >>>         process(chunk)
+    """
+
+    def __init__(self, columns=None, ignore_index=False, initial_capacity=1024,
+                 growth=2., max_bytes=None, spill_dir=None,
+                 spill_format='pickle'):
+        if growth <= 1:
+            raise ValueError('`growth` must be greater than 1')
+        if spill_format not in ('pickle', 'parquet'):
+            raise ValueError(f'`spill_format` must be "pickle" or "parquet", '
+                             f'not "{spill_format:s}"')
+        self.columns = None if columns is None else list(columns)
+        self.ignore_index = ignore_index
+        self.initial_capacity = initial_capacity
+        self.growth = growth
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_format = spill_format
+        self.n_rows = 0
+        self._parts = []  # DataFrames and finished block buffers, in order
+        self._parts_nbytes = 0
+        self._buffer = None
+        self._row_nbytes = {}  # columns -> estimated bytes per row
+        self._spilled = []  # paths of the spilled chunks, in order
+        self._tmp_dir = None
+        self._finalizer = None
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def nbytes(self):
+        """
+        Estimated size (bytes) of the data kept in memory.
+        """
+        buffer_nbytes = 0 if self._buffer is None else self._buffer.nbytes
+        return self._parts_nbytes + buffer_nbytes
+
+    @property
+    def n_spilled(self):
+        return len(self._spilled)
+
+    # Appending
+    # --------------------------------------------------------------------------
+
+    def append(self, block):
+        """
+        Add a DataFrame or a 2-D NumPy array (rows x columns).
+        """
+        if isinstance(block, pd.DataFrame):
+            self._append_frame(block)
+        else:
+            self._append_array(np.asarray(block))
+        if self.max_bytes is not None and self.nbytes > self.max_bytes:
+            self.spill()
+        return self
+
+    def extend(self, blocks):
+        """
+        Add all blocks of an iterable (e.g., a generator).
+        """
+        for block in blocks:
+            self.append(block)
+        return self
+
+    def _append_frame(self, df):
+        self._finish_buffer()
+        self._parts.append(df)
+        self.n_rows += len(df)
+        if self.max_bytes is not None:
+            key = tuple(df.columns)
+            row_nbytes = self._row_nbytes.get(key)
+            if row_nbytes is None:  # `memory_usage` is slow: estimate it once
+                row_nbytes = (df.memory_usage(index=True, deep=True).sum() /
+                              max(len(df), 1))
+                self._row_nbytes[key] = row_nbytes
+            self._parts_nbytes += int(row_nbytes * len(df))
+
+    def _append_array(self, arr):
+        if arr.ndim == 1:
+            arr = arr[:, np.newaxis]
+        if arr.ndim != 2:
+            raise ValueError(f'expected a 2-D array, got {arr.ndim:d} '
+                             f'dimensions')
+        if self.columns is not None and len(self.columns) != arr.shape[1]:
+            raise ValueError(f'expected {len(self.columns):d} columns, got '
+                             f'{arr.shape[1]:d}')
+        buffer = self._buffer
+        if (buffer is None or buffer.dtype != arr.dtype or
+                buffer.n_cols != arr.shape[1]):
+            self._finish_buffer()
+            buffer = self._buffer = _BlockBuffer(
+                arr.dtype, arr.shape[1], max(self.initial_capacity, len(arr)),
+                self.growth)
+        buffer.append(arr)
+        self.n_rows += len(arr)
+
+    def _finish_buffer(self):
+        """
+        Move the current block buffer to the finished parts.
+        """
+        if self._buffer is not None and self._buffer.n_rows:
+            self._parts.append(self._buffer)
+            self._parts_nbytes += self._buffer.nbytes
+        self._buffer = None
+
+    # Spilling
+    # --------------------------------------------------------------------------
+
+    def _memory_frame(self):
+        """
+        Data kept in memory as a single DataFrame (None if there is none).
+        """
+        parts = list(self._parts)
+        if self._buffer is not None and self._buffer.n_rows:
+            parts.append(self._buffer)
+        frames = [part.to_frame(self.columns, self.ignore_index)
+                  if isinstance(part, _BlockBuffer) else part
+                  for part in parts]
+        if not frames:
+            return None
+        if len(frames) == 1 and not self.ignore_index:
+            return frames[0]
+        return pd.concat(frames, ignore_index=self.ignore_index)
+
+    def spill(self):
+        """
+        Write the data kept in memory to a file and free the memory.
+        """
+        df = self._memory_frame()
+        if df is None:
+            return
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix='frame_accumulator_',
+                                             dir=self.spill_dir)
+            self._finalizer = weakref.finalize(self, shutil.rmtree,
+                                               self._tmp_dir, True)
+        path = os.path.join(self._tmp_dir,
+                            f'{len(self._spilled):06d}.{self.spill_format:s}')
+        if self.spill_format == 'parquet':
+            df.to_parquet(path)
+        else:
+            df.to_pickle(path)
+        self._spilled.append(path)
+        self._parts = []
+        self._parts_nbytes = 0
+        self._buffer = None
+
+    def _read_spilled(self, path):
+        if self.spill_format == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    # Output
+    # --------------------------------------------------------------------------
+
+    def iter_chunks(self):
+        """
+        Yield the accumulated data in order, as one DataFrame per spilled chunk
+        plus one for the data in memory, without loading all of it at once.
+        """
+        for path in self._spilled:
+            yield self._read_spilled(path)
+        df = self._memory_frame()
+        if df is not None:
+            yield df
+
+    def to_frame(self):
+        """
+        All accumulated data as a single DataFrame (more blocks can still be
+        added afterwards).
+        """
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return pd.DataFrame(columns=self.columns)
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=self.ignore_index)
+
+    def clear(self):
+        """
+        Remove all data (including the spill files).
+        """
+        self.n_rows = 0
+        self._parts = []
+        self._parts_nbytes = 0
+        self._buffer = None
+        self._spilled = []
+        if self._finalizer is not None:
+            self._finalizer()
+        self._tmp_dir = None
+        self._finalizer = None
+
+    close = clear
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,325 @@
+import datetime
+import glob
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+
+HistoryEntry = namedtuple('HistoryEntry', ['session', 'line', 'start', 'source'])
+"""
+One input of the IPython history: session number, line number in the session,
+start of the session and the code as typed (`source_raw`).
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session INTEGER PRIMARY KEY,
+    start TEXT,
+    end TEXT,
+    num_cmds INTEGER,
+    remark TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    source TEXT,
+    UNIQUE (session, line)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    source, content='entries', content_rowid='id', tokenize='{tokenize:s}'
+);
+"""
+
+
+def profile_history_paths(ipython_dir=None):
+    """
+    Paths of the history databases of all IPython profiles.
+    """
+    ipython_dir = ipython_dir or os.environ.get(
+        'IPYTHONDIR', os.path.join(os.path.expanduser('~'), '.ipython'))
+    return sorted(glob.glob(os.path.join(ipython_dir, 'profile_*',
+                                         'history.sqlite')))
+
+
+def _timestamp(value):
+    """
+    `value` as stored by IPython in `sessions.start` (text that sorts in time
+    order).
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f'expected a date, datetime or str, got {type(value)}')
+
+
+class HistoryIndex(object):
+    """
+    Full-text search over the IPython history database (`history.sqlite`).
+
+    The history database is only opened read-only. The searchable copy of the
+    inputs is kept in a separate SQLite file (`index_path`) with an FTS5 index
+    of the code and indexes by session and by session start, and `sync` only
+    copies the rows added to the history since the previous call. Several
+    IPython sessions can be running at the same time, so the progress is kept
+    per session (the last line indexed of each one).
+
+    With the default trigram tokenizer, a literal pattern matches any substring
+    (case-insensitive); patterns shorter than 3 characters are searched with a
+    `LIKE` scan.
+
+    Parameters
+    ----------
+    history_path : str
+        Path of `history.sqlite` (see `profile_history_paths`).
+    index_path : str, optional
+        Path of the index (default: `history_index.sqlite` next to
+        `history_path`). Use ':memory:' for a temporary index.
+    tokenize : str, optional
+        FTS5 tokenizer of a new index, e.g., 'unicode61' to match whole words
+        (smaller index, but no substrings).
+    auto_sync : bool, optional
+        Call `sync` before each search.
+    max_scan_rows : int, optional
+        Literal patterns are searched without the full-text index (`LIKE` scan)
+        if `since`/`until` select at most this number of inputs.
+
+    Examples
+    --------
+    >>> index = HistoryIndex(profile_history_paths()[0])
+    >>> for entry in index.search('groupby', since='2023-01-01', limit=10):
+    >>>     print(entry.session, entry.line, entry.source)
+    >>> list(index.search('pd AND NOT pandas', query=True))
+    """
+
+    def __init__(self, history_path, index_path=None, tokenize='trigram',
+                 auto_sync=True, max_scan_rows=50000):
+        if not os.path.isfile(history_path):
+            raise FileNotFoundError(history_path)
+        self.history_path = history_path
+        if index_path is None:
+            index_path = os.path.join(os.path.dirname(history_path),
+                                      'history_index.sqlite')
+        self.index_path = index_path
+        self.auto_sync = auto_sync
+        self.max_scan_rows = max_scan_rows
+        self.conn = sqlite3.connect(index_path, uri=True)
+        self.conn.executescript(_SCHEMA.format(tokenize=tokenize))
+        self.tokenize = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'entries_fts'"
+        ).fetchone()[0]
+        # The history is attached read-only (the URI encodes special characters)
+        uri = Path(history_path).resolve().as_uri() + '?mode=ro'
+        self.conn.execute('ATTACH DATABASE ? AS history', (uri,))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT count(*) FROM entries').fetchone()[0]
+
+    def sync(self):
+        """
+        Copy the new inputs (and new or updated sessions) from the history to
+        the index.
+
+        Returns
+        -------
+        int
+            Number of new inputs.
+        """
+        with self.conn:
+            last_id = self.conn.execute('SELECT max(id) FROM entries'
+                                        ).fetchone()[0] or 0
+            # Sessions still running get a new end and number of commands
+            self.conn.execute(
+                'INSERT OR REPLACE INTO sessions '
+                'SELECT h.session, h.start, h.end, h.num_cmds, h.remark '
+                'FROM history.sessions h '
+                'LEFT JOIN sessions s ON s.session = h.session '
+                'WHERE s.session IS NULL OR h.start IS NOT s.start '
+                'OR h.end IS NOT s.end OR h.num_cmds IS NOT s.num_cmds '
+                'OR h.remark IS NOT s.remark')
+            # Inputs after the last line indexed of each session. The sessions
+            # of the history are listed with one index lookup each, and so are
+            # their last lines (the primary key is (session, line)).
+            # (`rowcount` is not set for statements that start with `WITH`)
+            changes = self.conn.total_changes
+            self.conn.execute(
+                'WITH RECURSIVE hs(session) AS ('
+                '  SELECT min(session) FROM history.history '
+                '  UNION ALL '
+                '  SELECT (SELECT min(session) FROM history.history '
+                '          WHERE session > hs.session) '
+                '  FROM hs WHERE hs.session IS NOT NULL'
+                '), todo(session, last_line) AS ('
+                '  SELECT session, (SELECT max(line) FROM entries e '
+                '                   WHERE e.session = hs.session) '
+                '  FROM hs WHERE session IS NOT NULL'
+                ') '
+                'INSERT INTO entries (session, line, source) '
+                'SELECT h.session, h.line, h.source_raw '
+                'FROM todo JOIN history.history h ON h.session = todo.session '
+                'AND h.line > coalesce(todo.last_line, -1) '
+                'ORDER BY h.session, h.line')
+            n_new = self.conn.total_changes - changes
+            if n_new:
+                self.conn.execute(
+                    'INSERT INTO entries_fts (rowid, source) '
+                    'SELECT id, source FROM entries WHERE id > ?', (last_id,))
+        return n_new
+
+    def optimize(self):
+        """
+        Merge the segments of the full-text index (faster searches after many
+        small syncs).
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO entries_fts (entries_fts) VALUES ('optimize')")
+
+    def _session_range(self, since, until):
+        """
+        Range of sessions [first, last) that started in [`since`, `until`) (the
+        sessions are numbered in time order). `last` is None if there is no
+        upper bound.
+        """
+        first, last = 0, None
+        if since is not None:
+            first = self.conn.execute(
+                'SELECT min(session) FROM sessions WHERE start >= ?',
+                (_timestamp(since),)).fetchone()[0]
+            if first is None:
+                return 0, 0
+        if until is not None:
+            last = self.conn.execute(
+                'SELECT min(session) FROM sessions WHERE start >= ?',
+                (_timestamp(until),)).fetchone()[0]
+        return first, last
+
+    def search(self, pattern, since=None, until=None, session=None, limit=None,
+               query=False, oldest_first=False):
+        """
+        Inputs that contain `pattern`, newest first (in the order they were
+        indexed, which is the order of (session, line) unless several sessions
+        were running at the same time). The results are read from the database
+        as the iterator is consumed.
+
+        Parameters
+        ----------
+        pattern : str
+            Literal text, or an FTS5 query if `query` is True (e.g.,
+            '"read_csv" AND sep', see https://www.sqlite.org/fts5.html).
+        since, until : datetime, date or str, optional
+            Only sessions that started in [`since`, `until`).
+        session : int, optional
+            Only this session.
+        limit : int, optional
+            Maximum number of results.
+        query : bool, optional
+        oldest_first : bool, optional
+
+        Yields
+        ------
+        HistoryEntry
+        """
+        if self.auto_sync:
+            self.sync()
+        first, last = self._session_range(since, until)
+        if session is not None:
+            if session < first or (last is not None and session >= last):
+                return
+            first, last = session, session + 1
+        if last is not None and last <= first:
+            return
+
+        trigram = 'trigram' in self.tokenize
+        if since is None and until is None and session is None:
+            n_rows = self.conn.execute('SELECT max(id) FROM entries'
+                                       ).fetchone()[0] or 0
+        else:  # counted with the index on (session, line), up to the threshold
+            n_rows = self.conn.execute(
+                'SELECT count(*) FROM (SELECT 1 FROM entries '
+                'WHERE session >= ? AND session < ? LIMIT ?)',
+                (first, 2**63 - 1 if last is None else last,
+                 self.max_scan_rows + 1)).fetchone()[0]
+        # Literal patterns are searched with `LIKE` if they are too short for
+        # the trigram index or if few rows are selected
+        use_index = query or not trigram or (len(pattern) >= 3 and
+                                             n_rows > self.max_scan_rows)
+        if use_index:
+            match = pattern if query else '"' + pattern.replace('"', '""') + '"'
+            sql = ('SELECT e.session, e.line, s.start, e.source '
+                   'FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid '
+                   'LEFT JOIN sessions s ON s.session = e.session '
+                   'WHERE entries_fts MATCH ?')
+            id_column = 'entries_fts.rowid'
+            # `+` keeps SQLite from scanning the sessions instead of the matches
+            session_column = '+e.session'
+            params = [match]
+        else:
+            sql = ('SELECT e.session, e.line, s.start, e.source '
+                   'FROM entries e LEFT JOIN sessions s ON s.session = e.session '
+                   "WHERE e.source LIKE ? ESCAPE '\\'")
+            id_column = 'e.id'
+            session_column = 'e.session'
+            escaped = re.sub(r'([\\%_])', r'\\\1', pattern)
+            params = ['%' + escaped + '%']
+        if first:
+            sql += f' AND {session_column:s} >= ?'
+            params.append(first)
+        if last is not None:
+            sql += f' AND {session_column:s} < ?'
+            params.append(last)
+        if not use_index and (first or last is not None):
+            # Read the selected sessions with the index, then sort
+            id_column = '+' + id_column
+        sql += f' ORDER BY {id_column:s} {"ASC" if oldest_first else "DESC"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        for row in self.conn.execute(sql, params):
+            yield HistoryEntry(*row)
+
+    def session(self, session):
+        """
+        All inputs of a session, in order.
+        """
+        if self.auto_sync:
+            self.sync()
+        rows = self.conn.execute(
+            'SELECT e.session, e.line, s.start, e.source FROM entries e '
+            'LEFT JOIN sessions s ON s.session = e.session '
+            'WHERE e.session = ? ORDER BY e.line', (session,))
+        return [HistoryEntry(*row) for row in rows]
+
+    def sessions(self, since=None, until=None):
+        """
+        Sessions (session, start, end, num_cmds, remark) that started in
+        [`since`, `until`).
+        """
+        if self.auto_sync:
+            self.sync()
+        sql = 'SELECT session, start, end, num_cmds, remark FROM sessions'
+        conditions, params = [], []
+        if since is not None:
+            conditions.append('start >= ?')
+            params.append(_timestamp(since))
+        if until is not None:
+            conditions.append('start < ?')
+            params.append(_timestamp(until))
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return self.conn.execute(sql + ' ORDER BY session', params).fetchall()
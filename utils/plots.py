@@ -1,5 +1,15 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
 from matplotlib.patches import Polygon
+from matplotlib.ticker import FuncFormatter, MaxNLocator
 import numpy as np
 
 
@@ -10,7 +20,7 @@ def draw_boxplot(df, col_perc=('25_perc', '50_perc', '75_perc'),
                  figsize=(20, 5), fontsize_x=14, fontsize_y=14,
                  fontsize_title=16, y_lim=None, x_tick_labels=None,
                  rotation_x=90, title='', x_label_txt='', y_label_txt='',
-                 **boxplot_kwargs):
+                 ax=None, **boxplot_kwargs):
     """
     Draw custom boxplot.
 
@@ -50,12 +60,17 @@ def draw_boxplot(df, col_perc=('25_perc', '50_perc', '75_perc'),
     x_label_txt, y_label_txt : str, optional
         Text for the x- and y-axes. The default value is the index and column
         names, respectively.
+    ax : matplotlib Axes, optional
+        Axes where the boxplots are drawn. If not given, a new figure of size
+        `figsize` is created.
     boxplot_kwargs
         additional arguments to be passed to matplotlib's boxplot
 
     Returns
     -------
-    Side-by-side boxplots
+    fig, ax
+        Figure and axes of the side-by-side boxplots. Close the figure
+        (`plt.close(fig)`) when it is not needed anymore.
 
     Examples
     --------
@@ -102,13 +117,16 @@ def draw_boxplot(df, col_perc=('25_perc', '50_perc', '75_perc'),
     """
 
     n_box = len(df)  # number of boxplots
-    _, ax = plt.subplots(figsize=figsize)
+    if ax is None:
+        fig, ax = plt.subplots(figsize=figsize)
+    else:
+        fig = ax.figure
 
     # initialize boxplot with dummy data
     box_plot = ax.boxplot([[-9, -4, 2, 4, 9],]*n_box, **boxplot_kwargs)
     min_y, max_y = float('inf'), -float('inf')
 
-    for bb in xrange(n_box):
+    for bb in range(n_box):
 
         # Interquantile range
         IQR = (df.iloc[bb][col_perc[0]], df.iloc[bb][col_perc[2]])
@@ -164,13 +182,43 @@ def draw_boxplot(df, col_perc=('25_perc', '50_perc', '75_perc'),
         ylims = y_lim
     ax.set_ylim(ylims)
 
+    _format_axes(ax, df, fontsize_x=fontsize_x, fontsize_y=fontsize_y,
+                 fontsize_title=fontsize_title, x_tick_labels=x_tick_labels,
+                 rotation_x=rotation_x, title=title, x_label_txt=x_label_txt,
+                 y_label_txt=y_label_txt)
+
+    return fig, ax
+
+
+def _format_axes(ax, df, fontsize_x, fontsize_y, fontsize_title, x_tick_labels,
+                 rotation_x, title, x_label_txt, y_label_txt, max_xticks=None):
+    """
+    Ticks, grid and texts of the boxplots (see `draw_boxplot`).
+
+    If there are more than `max_xticks` boxes, only up to `max_xticks` of them
+    get a tick (creating one tick per box is slow for thousands of boxes).
+    """
+    n_box = len(df)
+
     # Ticks
     ax.tick_params(axis='y', labelsize=fontsize_y)
     if x_tick_labels is None:
         x_tick_labels = df.index.tolist()
-    ax.set_xticks(range(1, n_box+1))
-    ax.set_xticklabels(labels=x_tick_labels, rotation=rotation_x,
-                       fontsize=fontsize_x)
+    if max_xticks is not None and n_box > max_xticks:
+        labels = list(x_tick_labels)
+
+        def format_tick(x, pos):
+            ii = int(round(x)) - 1
+            return str(labels[ii]) if 0 <= ii < len(labels) else ''
+
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=max_xticks, integer=True))
+        ax.xaxis.set_major_formatter(FuncFormatter(format_tick))
+        ax.tick_params(axis='x', labelrotation=rotation_x,
+                       labelsize=fontsize_x)
+    else:
+        ax.set_xticks(range(1, n_box+1))
+        ax.set_xticklabels(labels=x_tick_labels, rotation=rotation_x,
+                           fontsize=fontsize_x)
 
     # Add a horizontal grid to the plot, but make it very light in color
     # so we can use it for reading data values but not be distracting
@@ -184,3 +232,242 @@ def draw_boxplot(df, col_perc=('25_perc', '50_perc', '75_perc'),
     ax.set_title(title, fontsize=fontsize_title)
     ax.set_xlabel(df.index.name or x_label_txt, fontsize=fontsize_x)
     ax.set_ylabel(df.columns.name or y_label_txt, fontsize=fontsize_y)
+
+
+def _flatten_column(values, positions):
+    """
+    Flatten a column whose rows contain a number or a collection of numbers.
+
+    Returns the values and the position (x-coordinate) of each value.
+    """
+    values = np.asarray(values, dtype=object)
+    try:
+        return values.astype(float), positions
+    except (TypeError, ValueError):  # some rows contain collections
+        arrays = [np.atleast_1d(np.asarray(v, dtype=float)).ravel()
+                  for v in values]
+        lengths = [len(a) for a in arrays]
+        return np.concatenate(arrays), np.repeat(positions, lengths)
+
+
+def draw_boxplot_batched(df, col_perc=('25_perc', '50_perc', '75_perc'),
+                         col_whisker=('whisker_min', 'whisker_max'),
+                         col_outliers=('outliers_min', 'outliers_max'),
+                         box_colors=('orchid', 'darkkhaki'),
+                         figsize=(20, 5), fontsize_x=14, fontsize_y=14,
+                         fontsize_title=16, y_lim=None, x_tick_labels=None,
+                         rotation_x=90, title='', x_label_txt='',
+                         y_label_txt='', sym=None, widths=None, max_xticks=50,
+                         ax=None):
+    """
+    Draw custom boxplot, for many boxes (thousands).
+
+    Same output as `draw_boxplot`, but each column of `df` is read once as a
+    NumPy array and all boxes are drawn together: one `PolyCollection` for the
+    boxes, one `LineCollection` for the medians, whiskers and caps each, and a
+    single line for all outliers.
+
+    Parameters
+    ----------
+    df, col_perc, col_whisker, col_outliers, box_colors, figsize, fontsize_x,
+    fontsize_y, fontsize_title, y_lim, x_tick_labels, rotation_x, title,
+    x_label_txt, y_label_txt
+        See `draw_boxplot`.
+    sym : str, optional
+        Format string of the outliers (e.g., 'k.'). Use '' to hide them. The
+        default is matplotlib's default for boxplots (`boxplot.flierprops` in
+        `rcParams`), as in `draw_boxplot`.
+    widths : float, optional
+        Width of the boxes. The default is the same as in matplotlib's boxplot.
+    max_xticks : int, optional
+        Maximum number of ticks (and labels) in the x-axis. Use None to have one
+        tick per box as in `draw_boxplot`.
+    ax : matplotlib Axes, optional
+        Axes where the boxplots are drawn. If not given, a new figure of size
+        `figsize` is created.
+
+    Returns
+    -------
+    fig, ax
+        Figure and axes of the boxplots.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame(data=np.sort((np.random
+                                        .RandomState(seed=44)
+                                        .randint(low=1, high=100,
+                                                 size=(5000, 7))),
+                                       axis=1),
+                          columns=['outliers_min', 'whisker_min', '25_perc',
+                                   '50_perc', '75_perc', 'whisker_max',
+                                   'outliers_max'])
+    >>> fig, ax = draw_boxplot_batched(df, sym='k.')
+    """
+    n_box = len(df)
+    if ax is None:
+        fig, ax = plt.subplots(figsize=figsize)
+    else:
+        fig = ax.figure
+
+    x = np.arange(1, n_box + 1, dtype=float)
+    if widths is None:
+        widths = min(0.15 * max(n_box - 1, 1.0), 0.5)
+    q1, med, q3 = df[list(col_perc)].to_numpy(dtype=float).T
+    cl_min, cl_max = df[list(col_whisker)].to_numpy(dtype=float).T
+    out_min, x_out_min = _flatten_column(df[col_outliers[0]].to_numpy(), x)
+    out_max, x_out_max = _flatten_column(df[col_outliers[1]].to_numpy(), x)
+
+    left, right = x - widths / 2, x + widths / 2
+    cap_left, cap_right = x - widths / 4, x + widths / 4
+    rc = plt.rcParams
+
+    # Boxes (filled, alternating between the colors)
+    boxes = np.stack([np.column_stack([left, q1]), np.column_stack([right, q1]),
+                      np.column_stack([right, q3]), np.column_stack([left, q3])],
+                     axis=1)
+    face_colors = [to_rgba(box_colors[bb % len(box_colors)], alpha=.5)
+                   for bb in range(min(n_box, len(box_colors)))]
+    ax.add_collection(PolyCollection(
+        boxes, facecolors=face_colors, edgecolors='black',
+        linewidths=rc.get('boxplot.boxprops.linewidth', 1.0)))
+
+    # Medians
+    medians = np.stack([np.column_stack([left, med]),
+                        np.column_stack([right, med])], axis=1)
+    ax.add_collection(LineCollection(
+        medians, colors=rc.get('boxplot.medianprops.color', 'red'),
+        linewidths=rc.get('boxplot.medianprops.linewidth', 1.0)))
+
+    # Whiskers (lower and higher)
+    whiskers = np.concatenate([
+        np.stack([np.column_stack([x, cl_min]), np.column_stack([x, q1])],
+                 axis=1),
+        np.stack([np.column_stack([x, q3]), np.column_stack([x, cl_max])],
+                 axis=1)])
+    ax.add_collection(LineCollection(
+        whiskers, colors='black',
+        linestyles=rc.get('boxplot.whiskerprops.linestyle', '--'),
+        linewidths=rc.get('boxplot.whiskerprops.linewidth', 1.0)))
+
+    # Caps (lower and higher)
+    caps = np.concatenate([
+        np.stack([np.column_stack([cap_left, cl_min]),
+                  np.column_stack([cap_right, cl_min])], axis=1),
+        np.stack([np.column_stack([cap_left, cl_max]),
+                  np.column_stack([cap_right, cl_max])], axis=1)])
+    ax.add_collection(LineCollection(
+        caps, colors=rc.get('boxplot.capprops.color', 'black'),
+        linewidths=rc.get('boxplot.capprops.linewidth', 1.0)))
+
+    # Fliers
+    x_out, out = np.r_[x_out_min, x_out_max], np.r_[out_min, out_max]
+    if sym is None:
+        ax.plot(x_out, out,
+                linestyle='none',
+                color=rc.get('boxplot.flierprops.color', 'black'),
+                marker=rc.get('boxplot.flierprops.marker', 'o'),
+                markerfacecolor=rc.get('boxplot.flierprops.markerfacecolor',
+                                       'none'),
+                markeredgecolor=rc.get('boxplot.flierprops.markeredgecolor',
+                                       'black'),
+                markeredgewidth=rc.get('boxplot.flierprops.markeredgewidth',
+                                       1.0),
+                markersize=rc.get('boxplot.flierprops.markersize', 6.0))
+    elif sym:
+        ax.plot(x_out, out, sym)
+
+    # Axes limits
+    ax.set_xlim(0.5, n_box + 0.5)
+    if y_lim is None:
+        min_y = np.nanmin(np.r_[out_min, cl_min])
+        max_y = np.nanmax(np.r_[out_max, cl_max])
+        ylims = np.array([min_y, max_y])
+        ylims = ylims + [-0.1*np.ptp(ylims), 0.1*np.ptp(ylims)]
+        # set the limits to 10% above and below the extreme values
+    else:
+        ylims = y_lim
+    ax.set_ylim(ylims)
+
+    _format_axes(ax, df, fontsize_x=fontsize_x, fontsize_y=fontsize_y,
+                 fontsize_title=fontsize_title, x_tick_labels=x_tick_labels,
+                 rotation_x=rotation_x, title=title, x_label_txt=x_label_txt,
+                 y_label_txt=y_label_txt, max_xticks=max_xticks)
+
+    return fig, ax
+
+
+RenderResult = namedtuple('RenderResult', ['name', 'path', 'seconds'])
+
+
+def _render_boxplot(name, df, path, fmt, batched, savefig_kwargs,
+                    boxplot_kwargs):
+    t0 = perf_counter()
+    # Headless: an Agg canvas that is not managed by pyplot, whatever the
+    # current backend is, and is freed when it goes out of scope
+    fig = Figure(figsize=boxplot_kwargs.get('figsize', (20, 5)))
+    FigureCanvasAgg(fig)
+    draw = draw_boxplot_batched if batched else draw_boxplot
+    draw(df, ax=fig.add_subplot(), **boxplot_kwargs)
+    fig.savefig(path, format=fmt, **savefig_kwargs)
+    return RenderResult(name, path, perf_counter() - t0)
+
+
+def render_boxplots(frames, out_dir, workers=None, fmt='png', batched=True,
+                    savefig_kwargs=None, **boxplot_kwargs):
+    """
+    Render many boxplots to files in a pool of processes.
+
+    Each figure is drawn on a non-interactive Agg canvas that is not managed by
+    pyplot (in the worker processes and in the current process), so nothing is
+    shown and the memory does not grow with the number of figures.
+
+    Parameters
+    ----------
+    frames : dict or iterable
+        Figure name --> DataFrame (see `draw_boxplot`), or an iterable of
+        (name, DataFrame) pairs. The file of each figure is
+        `<out_dir>/<name>.<fmt>`.
+    out_dir : str
+        Output directory (created if it does not exist).
+    workers : int, optional
+        Number of processes (default: number of CPUs). With 1 worker, the
+        figures are rendered in the current process.
+    fmt : str, optional
+        File format (e.g., 'png', 'pdf', 'svg').
+    batched : bool, optional
+        Draw with `draw_boxplot_batched` (default) or `draw_boxplot`.
+    savefig_kwargs : dict, optional
+        Additional arguments to `Figure.savefig` (e.g., {'dpi': 100}).
+    boxplot_kwargs
+        Additional arguments to the drawing function, same for all figures.
+
+    Returns
+    -------
+    list of RenderResult
+        Name, file path and rendering time in seconds of each figure, in the
+        same order as `frames`.
+
+    Examples
+    --------
+    >>> frames = {f'report_{ii:d}': df for ii, df in enumerate(dfs)}
+    >>> results = render_boxplots(frames, 'figures', workers=8, sym='k.')
+    >>> sum(r.seconds for r in results)
+    """
+    if hasattr(frames, 'items'):
+        frames = frames.items()
+    os.makedirs(out_dir, exist_ok=True)
+    savefig_kwargs = savefig_kwargs or {}
+    tasks = [(name, df, os.path.join(out_dir, f'{name}.{fmt}'))
+             for name, df in frames]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        return [_render_boxplot(name, df, path, fmt, batched, savefig_kwargs,
+                                boxplot_kwargs)
+                for name, df, path in tasks]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        futures = [executor.submit(_render_boxplot, name, df, path, fmt,
+                                   batched, savefig_kwargs, boxplot_kwargs)
+                   for name, df, path in tasks]
+        return [future.result() for future in futures]
@@ -0,0 +1,443 @@
+"""
+Bulk loading of pandas DataFrames or rows into PostgreSQL with `COPY ... FROM
+STDIN`, which is much faster than one `INSERT` per row.
+
+Requires `psycopg2` (imported only when a connection is made).
+
+Usage
+-----
+$ python utils/postgres.py  # checks and demo on a throwaway cluster (`initdb`)
+$ python utils/postgres.py --bin-dir /usr/lib/postgresql/16/bin --rows 100000
+"""
+import csv
+import io
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import chain, islice
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+
+class CopyStats(namedtuple('CopyStats', ['table', 'rows', 'bytes', 'seconds'])):
+    """
+    Result of a `copy_into` call (`bytes` is the length of the CSV text sent).
+    """
+    __slots__ = ()
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return (f'{self.table:s}: {self.rows:,d} rows, '
+                f'{self.bytes / 2**20:,.1f} MB in {self.seconds:.2f} s '
+                f'({self.rows_per_second:,.0f} rows/s)')
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of `psycopg2` connections shared by concurrent loaders.
+
+    `connection()` waits until a connection is free (instead of failing when
+    all `maxconn` connections are in use), commits when the block succeeds and
+    rolls back otherwise.
+
+    Parameters
+    ----------
+    dsn : str, optional
+        Connection string, e.g., 'host=localhost port=5432 dbname=mydb'.
+    minconn, maxconn : int, optional
+        Number of connections opened at the start, and maximum number.
+    connect_kwargs
+        Passed to `psycopg2.connect`.
+
+    Examples
+    --------
+    >>> with ConnectionPool('dbname=mydb', maxconn=4) as pool:
+    >>>     copy_into(pool, 'events', df)
+    >>>     with pool.connection() as conn, conn.cursor() as cur:
+    >>>         cur.execute('SELECT count(*) FROM events')
+    """
+
+    def __init__(self, dsn=None, minconn=1, maxconn=4, **connect_kwargs):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self.maxconn = maxconn
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn,
+                                            **connect_kwargs)
+        self._available = threading.BoundedSemaphore(maxconn)
+
+    @contextmanager
+    def connection(self):
+        with self._available:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn, close=bool(conn.closed))
+
+    def close(self):
+        self._pool.closeall()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _is_frame(obj):
+    # A DataFrame can only exist if pandas was imported
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(obj, pd.DataFrame)
+
+
+def _whole_floats_as_ints(df):
+    """
+    Float columns whose values are whole numbers (or NaN), converted to nullable
+    integers. pandas stores an integer column with missing values as float64,
+    which `to_csv` writes as '1.0', and `COPY` rejects '1.0' for an integer
+    column ('1' is still a valid float).
+    """
+    import numpy as np
+
+    converted = None
+    for ii in range(df.shape[1]):
+        col = df.iloc[:, ii]
+        if col.dtype.kind != 'f':
+            continue
+        values = col.to_numpy()
+        values = values[~np.isnan(values)]
+        if (values == np.trunc(values)).all() and (np.abs(values) < 2**63).all():
+            if converted is None:
+                converted = df.copy(deep=False)
+            converted.isetitem(ii, col.astype('Int64'))
+    return df if converted is None else converted
+
+
+def _csv_chunks(items, frames, chunk_rows, index):
+    """
+    CSV text of at most `chunk_rows` rows at a time, as (number of rows, text).
+    """
+    if frames:
+        for df in items:
+            df = _whole_floats_as_ints(df)
+            for start in range(0, len(df), chunk_rows):
+                chunk = df.iloc[start:start + chunk_rows]
+                yield len(chunk), chunk.to_csv(index=index, header=False)
+        return
+
+    # Rows (None is written as an empty unquoted field: NULL)
+    while True:
+        rows = list(islice(items, chunk_rows))
+        if not rows:
+            return
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator='\n').writerows(rows)
+        yield len(rows), buf.getvalue()
+
+
+class _ChunkReader(object):
+    """
+    File-like object for `cursor.copy_expert` that produces the text on demand,
+    so only one chunk is in memory at a time.
+    """
+
+    def __init__(self, chunks, on_chunk):
+        self._chunks = chunks
+        self._on_chunk = on_chunk
+        self._buffer = ''
+        self._pos = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) - self._pos < size:
+            n_rows, text = next(self._chunks, (0, None))
+            if text is None:
+                break
+            self._buffer = self._buffer[self._pos:] + text
+            self._pos = 0
+            self._on_chunk(n_rows, len(text))
+        if size < 0:
+            size = len(self._buffer) - self._pos
+        text = self._buffer[self._pos:self._pos + size]
+        self._pos += len(text)
+        return text
+
+
+def copy_into(conn, table, data, columns=None, chunk_rows=50000, index=False,
+              log_interval=10.):
+    """
+    Load rows into an existing table with `COPY table FROM STDIN` (CSV format).
+
+    The data is converted to CSV `chunk_rows` rows at a time while it is sent,
+    so the memory does not depend on the number of rows (when `data` is an
+    iterator), and the whole load is one transaction.
+
+    Parameters
+    ----------
+    conn : ConnectionPool or psycopg2 connection
+        With a pool, a connection is taken from it for the duration of the copy.
+        A plain connection is committed at the end (rolled back on errors).
+    table : str
+        Table name, optionally with the schema ('schema.table').
+    data : DataFrame, iterable of DataFrames or iterable of rows (sequences)
+        NaN/None values are loaded as NULL (so are empty strings, in CSV).
+        Float columns with only whole numbers and NaN (integer columns with
+        missing values, in pandas) are written as integers.
+    columns : list of str, optional
+        Columns of the table in the order of the data, including the index if
+        `index` is True (default: the index names and columns of the first
+        DataFrame, or all columns of the table in order, for rows).
+    chunk_rows : int, optional
+    index : bool, optional
+        Also load the index of the DataFrames (as the first columns).
+    log_interval : float, optional
+        Log the progress (rows/s) with the `logging` module at most once every
+        `log_interval` seconds.
+
+    Returns
+    -------
+    CopyStats
+
+    Examples
+    --------
+    >>> copy_into(conn, 'events', pd.read_csv('events.csv', chunksize=10**5))
+    >>> copy_into(pool, 'public.points', ((i, i**2) for i in range(10**7)),
+    >>>           columns=['x', 'y'])
+    """
+    if isinstance(conn, ConnectionPool):
+        with conn.connection() as pooled_conn:
+            return copy_into(pooled_conn, table, data, columns, chunk_rows,
+                             index, log_interval)
+
+    from psycopg2 import sql
+
+    items = iter([data] if _is_frame(data) else data)
+    first = next(items, None)
+    if first is None:
+        return CopyStats(table, 0, 0, 0.)
+    frames = _is_frame(first)
+    if columns is None and frames:
+        columns = list(first.columns)
+        if index:
+            columns = [name or 'index' for name in first.index.names] + columns
+    chunks = _csv_chunks(chain([first], items), frames, chunk_rows, index)
+
+    statement = sql.SQL('COPY {} {}FROM STDIN WITH (FORMAT csv)').format(
+        sql.Identifier(*table.split('.')),
+        sql.SQL('') if columns is None else
+        sql.SQL('({}) ').format(sql.SQL(', ').join(
+            sql.Identifier(str(column)) for column in columns)))
+
+    t0 = last_log = perf_counter()
+    total_rows = total_chars = 0
+
+    def on_chunk(n_rows, n_chars):
+        nonlocal last_log, total_rows, total_chars
+        total_rows += n_rows
+        total_chars += n_chars
+        now = perf_counter()
+        if now - last_log >= log_interval:
+            last_log = now
+            logger.info('%s', CopyStats(table, total_rows, total_chars,
+                                        now - t0))
+
+    reader = _ChunkReader(chunks, on_chunk)
+    with conn, conn.cursor() as cur:
+        cur.copy_expert(statement, reader, size=2**20)
+    stats = CopyStats(table, total_rows, total_chars, perf_counter() - t0)
+    logger.info('%s', stats)
+    return stats
+
+
+def copy_many(pool, table, sources, workers=None, **kwargs):
+    """
+    Load several sources (e.g., one iterator of DataFrames per input file) into
+    a table concurrently, each with its own connection from `pool`.
+
+    Parameters
+    ----------
+    pool : ConnectionPool
+    table : str
+    sources : iterable
+        Each item is the `data` of a `copy_into` call.
+    workers : int, optional
+        Number of threads (default: `pool.maxconn`).
+    kwargs
+        Passed to `copy_into`.
+
+    Returns
+    -------
+    list of CopyStats
+        In the order of `sources`. The total throughput is
+        `sum(s.rows for s in stats) / elapsed time`.
+    """
+    workers = workers or pool.maxconn
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(copy_into, pool, table, data, **kwargs)
+                   for data in sources]
+        return [future.result() for future in futures]
+
+
+@contextmanager
+def temporary_cluster(port=54329, bin_dir=None):
+    """
+    Throwaway PostgreSQL cluster, as in `cookbook/postgresql/postgresql.md`:
+    `initdb` in a temporary directory and a server that only listens on a Unix
+    socket in that directory. Everything is deleted at the end.
+
+    Parameters
+    ----------
+    port : int, optional
+        Port number (it only names the socket file).
+    bin_dir : str, optional
+        Directory of `initdb` and `pg_ctl` (default: found in the PATH).
+
+    Yields
+    ------
+    str
+        Connection string.
+
+    Examples
+    --------
+    >>> with temporary_cluster() as dsn, ConnectionPool(dsn) as pool:
+    >>>     ...
+    """
+    def run(program, *args):
+        if bin_dir is not None:
+            program = os.path.join(bin_dir, program)
+        try:
+            subprocess.run([program, *args], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as error:
+            raise RuntimeError(f'{os.path.basename(program):s} failed: '
+                               f'{error.stderr.decode().strip():s}') from error
+
+    tmp_dir = tempfile.mkdtemp(prefix='pg_')
+    data_dir = os.path.join(tmp_dir, 'data')
+    try:
+        run('initdb', '-D', data_dir, '-U', 'postgres', '--auth=trust',
+            '-E', 'UTF8')
+        run('pg_ctl', '-D', data_dir, '-l', os.path.join(tmp_dir, 'server.log'),
+            '-w', '-o', f"-k {tmp_dir:s} -p {port:d} -c listen_addresses=''",
+            'start')
+        try:
+            yield f'host={tmp_dir:s} port={port:d} user=postgres dbname=postgres'
+        finally:
+            run('pg_ctl', '-D', data_dir, '-m', 'fast', '-w', 'stop')
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _demo_rows(source, n_rows):
+    for x in range(n_rows):
+        yield source, x, None if x % 10 == 0 else f'p{x:d}'
+
+
+def _check(pool):
+    """
+    Checks of `copy_into` and `copy_many` on an empty database.
+    """
+    import numpy as np
+    import pandas as pd
+
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute('CREATE TABLE checks (id bigint, n int, x float8, s text)')
+
+    def fetch(sql):
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(sql)
+            return cur.fetchall()
+
+    # Integer column with missing values (float64 in pandas), several chunks
+    df = pd.DataFrame({'id': np.arange(5), 'n': [1, None, 3, None, 5],
+                       'x': [0.5, 1., np.nan, 2.25, -1.],
+                       's': ['a', None, 'b,"c"', '', 'd\ne']})
+    assert df['n'].dtype == float
+    stats = copy_into(pool, 'checks', df, chunk_rows=2)
+    assert stats.rows == 5
+    assert fetch('SELECT id, n, x, s FROM checks ORDER BY id') == [
+        (0, 1, 0.5, 'a'), (1, None, 1., None), (2, 3, None, 'b,"c"'),
+        (3, None, 2.25, None), (4, 5, -1., 'd\ne')]
+
+    # Index as the first column, iterator of DataFrames
+    frames = (df.set_index('id').iloc[ii:ii + 2] for ii in range(0, 5, 2))
+    assert copy_into(pool, 'checks', frames, index=True).rows == 5
+    assert fetch('SELECT count(*), count(n) FROM checks') == [(10, 6)]
+
+    # Rows, a subset of the columns
+    assert copy_into(pool, 'checks', ((ii, None) for ii in range(10, 20)),
+                     columns=['id', 's'], chunk_rows=3).rows == 10
+    assert fetch('SELECT count(*), sum(id) FROM checks WHERE id >= 10') == [
+        (10, 145)]
+
+    # Bad data: nothing is loaded and the connection can be used again
+    try:
+        copy_into(pool, 'checks', [(1, 'not a number')], columns=['id', 'n'])
+    except Exception as error:
+        assert 'not a number' in str(error)
+    else:
+        raise AssertionError('expected an error')
+    assert fetch('SELECT count(*) FROM checks') == [(20,)]
+
+    # More sources than connections: the loaders wait for a free connection
+    stats = copy_many(pool, 'checks',
+                      [_demo_rows(source, 1000) for source in range(100, 110)],
+                      workers=2 * pool.maxconn, columns=['id', 'n', 's'])
+    assert [s.rows for s in stats] == [1000] * 10
+    assert fetch('SELECT id, count(*), count(s) FROM checks WHERE id >= 100 '
+                 'GROUP BY id ORDER BY id') == [
+        (source, 1000, 900) for source in range(100, 110)]
+
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute('DROP TABLE checks')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Checks and throughput demo on a throwaway cluster')
+    parser.add_argument('--bin-dir', default=None,
+                        help='directory of `initdb` and `pg_ctl`')
+    parser.add_argument('--rows', type=int, default=10**6,
+                        help='number of rows per source')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    n_sources, n_rows = 4, args.rows
+
+    with temporary_cluster(bin_dir=args.bin_dir) as dsn, \
+            ConnectionPool(dsn, maxconn=4) as pool:
+        _check(pool)
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute('CREATE TABLE points (source int, x bigint, y text)')
+
+        t0 = perf_counter()
+        stats = copy_many(pool, 'points',
+                          [_demo_rows(source, n_rows)
+                           for source in range(n_sources)],
+                          columns=['source', 'x', 'y'])
+        seconds = perf_counter() - t0
+
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute('SELECT source, count(*), count(y) FROM points '
+                        'GROUP BY source ORDER BY source')
+            assert cur.fetchall() == [(source, n_rows, n_rows * 9 // 10)
+                                      for source in range(n_sources)]
+        print(f'{n_sources * n_rows:,d} rows in {seconds:.2f} s '
+              f'({n_sources * n_rows / seconds:,.0f} rows/s)')
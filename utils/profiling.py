@@ -0,0 +1,263 @@
+import functools
+import logging
+import random
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class _State(object):
+    enabled = False
+    track_allocations = False
+
+
+_state = _State()
+_lock = threading.Lock()
+_stats = {}
+
+
+class CallStats(object):
+    """
+    Statistics of the calls of one instrumented function or code block.
+
+    The latencies are kept in a reservoir sample of at most `max_samples`
+    values, so the percentiles use bounded memory.
+    """
+
+    def __init__(self, name, max_samples=1024):
+        self.name = name
+        self.max_samples = max_samples
+        self.count = 0
+        self.total = 0.
+        self.min = float('inf')
+        self.max = 0.
+        self.allocated = 0  # net bytes allocated (only with tracemalloc)
+        self._samples = []
+        self._random = random.Random(0)
+
+    def add(self, seconds, allocated=0):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.allocated += allocated
+        if len(self._samples) < self.max_samples:
+            self._samples.append(seconds)
+        else:  # reservoir sampling
+            ii = self._random.randrange(self.count)
+            if ii < self.max_samples:
+                self._samples[ii] = seconds
+
+    def percentile(self, q):
+        """
+        Approximate `q`-th percentile (0 <= `q` <= 100) of the latencies.
+        """
+        if not self._samples:
+            return float('nan')
+        samples = sorted(self._samples)
+        return samples[min(int(q / 100 * len(samples)), len(samples) - 1)]
+
+    def as_dict(self):
+        return {'name': self.name,
+                'count': self.count,
+                'total_s': self.total,
+                'mean_s': self.total / self.count if self.count else float('nan'),
+                'min_s': self.min if self.count else float('nan'),
+                'p50_s': self.percentile(50),
+                'p90_s': self.percentile(90),
+                'p99_s': self.percentile(99),
+                'max_s': self.max,
+                'allocated_bytes': self.allocated}
+
+
+def enable(track_allocations=False):
+    """
+    Start recording. With `track_allocations`, `tracemalloc` is started and the
+    net memory allocated by each call is recorded too (this makes the
+    instrumented code much slower).
+    """
+    _state.track_allocations = track_allocations
+    if track_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _state.enabled = True
+
+
+def disable():
+    """
+    Stop recording (the statistics are kept, see `reset`).
+    """
+    _state.enabled = False
+    if _state.track_allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state.track_allocations = False
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def reset():
+    """
+    Remove all statistics.
+    """
+    with _lock:
+        _stats.clear()
+
+
+def _record(name, seconds, allocated):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = CallStats(name)
+        stats.add(seconds, allocated)
+
+
+def instrument(fn=None, name=None):
+    """
+    Decorator that records the calls of a function while recording is enabled
+    (see `enable`). When it is disabled, the only overhead is a flag check and
+    an extra function call (about 0.3 us).
+
+    Examples
+    --------
+    >>> @instrument
+    >>> def f(x):
+    >>>     ...
+
+    >>> @instrument(name='graphs.dijkstra')
+    >>> def dijkstra(graph, start_node):
+    >>>     ...
+    """
+    if fn is None:
+        return functools.partial(instrument, name=name)
+    name = name or f'{fn.__module__:s}.{fn.__qualname__:s}'
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _state.enabled:
+            return fn(*args, **kwargs)
+        with timed(name):
+            return fn(*args, **kwargs)
+
+    wrapper.__wrapped_name__ = name
+    return wrapper
+
+
+@contextmanager
+def timed(name):
+    """
+    Context manager that records the execution of a code block.
+
+    Examples
+    --------
+    >>> with timed('load graph'):
+    >>>     graph = load(...)
+    """
+    if not _state.enabled:
+        yield
+        return
+    track = _state.track_allocations and tracemalloc.is_tracing()
+    mem_before = tracemalloc.get_traced_memory()[0] if track else 0
+    t0 = perf_counter()
+    try:
+        yield
+    finally:
+        seconds = perf_counter() - t0
+        allocated = tracemalloc.get_traced_memory()[0] - mem_before if track else 0
+        _record(name, seconds, allocated)
+
+
+def instrument_functions(module, names):
+    """
+    Replace the functions `names` of `module` by instrumented versions (for code
+    that cannot be decorated).
+
+    Note that calls made inside the module through the global name (e.g.,
+    recursion) are recorded too.
+
+    Examples
+    --------
+    >>> import graphs
+    >>> instrument_functions(graphs, ['bfs', 'dijkstra'])
+    """
+    for fn_name in names:
+        fn = getattr(module, fn_name)
+        if not hasattr(fn, '__wrapped_name__'):  # not instrumented yet
+            setattr(module, fn_name,
+                    instrument(fn, name=f'{module.__name__:s}.{fn_name:s}'))
+
+
+def summary():
+    """
+    Statistics of all instrumented functions, sorted by total time.
+    """
+    with _lock:
+        stats = [s.as_dict() for s in _stats.values()]
+    return sorted(stats, key=lambda s: s['total_s'], reverse=True)
+
+
+def format_summary():
+    """
+    Summary as a table (one line per function).
+    """
+    lines = [f'{"name":<40s} {"count":>10s} {"total (s)":>10s} '
+             f'{"mean (ms)":>10s} {"p50 (ms)":>10s} {"p99 (ms)":>10s} '
+             f'{"alloc (kB)":>10s}']
+    for s in summary():
+        lines.append(f'{s["name"]:<40s} {s["count"]:>10d} {s["total_s"]:>10.3f} '
+                     f'{1e3 * s["mean_s"]:>10.3f} {1e3 * s["p50_s"]:>10.3f} '
+                     f'{1e3 * s["p99_s"]:>10.3f} '
+                     f'{s["allocated_bytes"] / 1024:>10.1f}')
+    return '\n'.join(lines)
+
+
+def log_summary(logger, level=logging.INFO):
+    """
+    Emit the summary through `logger` (and therefore through its handlers).
+    """
+    if _stats:
+        logger.log(level, 'Instrumentation summary:\n%s', format_summary())
+
+
+class SummaryReporter(object):
+    """
+    Background thread that emits the summary through a logger every `interval`
+    seconds (and once more when stopped).
+
+    Examples
+    --------
+    >>> enable()
+    >>> with SummaryReporter(logging.getLogger(__name__), interval=60):
+    >>>     run_job()
+    """
+
+    def __init__(self, logger, interval=60., level=logging.INFO):
+        self.logger = logger
+        self.interval = interval
+        self.level = level
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            log_summary(self.logger, self.level)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        log_summary(self.logger, self.level)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,3 +1,9 @@
+import multiprocessing
+import sys
+import threading
+from time import monotonic
+
+
 class ProgressBar(object):
     """
     Display progress bar
@@ -14,6 +20,15 @@ class ProgressBar(object):
     - fraction (float): fraction of the progress bar (0 <= `fraction` <= 1)
         - If `fraction` = None, `fraction` will be set equal to
           float(`value`) / `n_steps`
+    - min_interval (float): minimum time in seconds between renderings of the
+      bar (low-overhead mode for tight loops)
+        - If `min_interval` = None, the bar is rendered at every update
+        - Otherwise, `update_bar` only increments a counter, except when the
+          visible bar may change (every 0.1%) and at least `min_interval`
+          seconds passed since the last rendering; `show_bar` only writes
+          when the bar changed
+    - show_rate (bool): display the rate (items/s) and the estimated time of
+      arrival (ETA)
 
     Returns
     -------
@@ -40,15 +55,30 @@ class ProgressBar(object):
     >>> progress_bar_alt.description = 'Done!'
     >>> progress_bar.message = 'Done!'
     >>> progress_bar.show_bar()
+
+    >>> n_steps = 10**7
+    >>> progress_bar = ProgressBar(n_steps=n_steps, message='Running',
+                                   min_interval=0.1, show_rate=True)
+    >>> for ii in range(n_steps):
+    >>>     progress_bar.update_bar()
+    >>>     progress_bar.show_bar()
     """
 
     def __init__(self, message='', char='=', nchars=40, value=0, n_steps=100,
-                 fraction=None):
+                 fraction=None, min_interval=None, show_rate=False):
         self._message = message
         self.char = char
         self.nchars = nchars
         self._value = value
         self.n_steps = n_steps
+        self.min_interval = min_interval
+        self.show_rate = show_rate
+        self._start_time = monotonic()
+        self._last_render = -float('inf')
+        # number of steps between two possible changes of the visible bar
+        self._render_step = max(n_steps // 1000, 1)
+        self._next_render = value
+        self._shown_str = None
         if fraction is None:
             fraction = float(self.value) / self.n_steps
         self._fraction = fraction
@@ -75,6 +105,10 @@ class ProgressBar(object):
     @value.setter
     def value(self, value):
         self._value = value
+        if self.min_interval is not None:
+            if value >= self._next_render or value >= self.n_steps:
+                self._render_lazily(float(value) / self.n_steps)
+            return
         self.fraction = float(self.value) / self.n_steps
         self.create_bar(fraction=self.fraction)
 
@@ -92,13 +126,203 @@ class ProgressBar(object):
                         "".format(msg=message,
                                   bar=bar,
                                   fraction=fraction))
+        if self.show_rate:
+            self.bar_str += self._rate_str()
+
+    def _rate_str(self):
+        elapsed = monotonic() - self._start_time
+        rate = self.value / elapsed if elapsed > 0 else 0.
+        if rate > 0:
+            eta = max(self.n_steps - self.value, 0) / rate
+            eta_str = '{:d}:{:02d}:{:02d}'.format(int(eta // 3600),
+                                                  int(eta % 3600 // 60),
+                                                  int(eta % 60))
+        else:
+            eta_str = '?'
+        return ' {rate:10.4g} it/s, ETA {eta:>8s}'.format(rate=rate, eta=eta_str)
+
+    def _render_lazily(self, fraction):
+        """
+        Render the bar if at least `min_interval` seconds passed since the last
+        rendering (or if it is complete).
+        """
+        self._next_render = self._value + self._render_step
+        now = monotonic()
+        if now - self._last_render >= self.min_interval or fraction >= 1:
+            self._last_render = now
+            self._fraction = fraction
+            self.create_bar(fraction=fraction)
 
     def update_bar(self, fraction=None):
-        if fraction is None:
+        if self.min_interval is not None:
+            if fraction is None:
+                self._value += 1  # O(1), no rendering
+                if self._value < self._next_render and self._value < self.n_steps:
+                    return
+                fraction = float(self._value) / self.n_steps
+            self._render_lazily(fraction)
+        elif fraction is None:
             self.value += 1
         else:
             self.fraction = fraction
 
     def show_bar(self):
+        if self.min_interval is not None:
+            if self.bar_str is self._shown_str:  # nothing changed
+                return
+            self._shown_str = self.bar_str
         sys.stdout.write(self.bar_str)
         sys.stdout.flush()
+
+
+class ProgressCounter(object):
+    """
+    Counter of a `ProgressAggregator` bar, used by one worker (thread or
+    process).
+
+    The increments are accumulated locally and added to the shared counter
+    (under its lock) only every `batch_size` increments, so the workers rarely
+    wait for each other. Call `flush` (or use the counter as a context manager)
+    when the worker finishes.
+    """
+
+    def __init__(self, values, index, batch_size=100):
+        self._values = values
+        self.index = index
+        self.batch_size = batch_size
+        self._pending = 0
+
+    def increment(self, n=1):
+        self._pending += n
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with self._values.get_lock():
+                self._values[self.index] += self._pending
+            self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+class ProgressAggregator(object):
+    """
+    Display the progress of parallel workers (threads or processes).
+
+    The counters of all bars are in shared memory. Each worker increments its
+    own `ProgressCounter` (see `counter`), and a single background thread draws
+    all bars (one per line, rendered with `ProgressBar`) every `interval`
+    seconds, so the workers never write to the terminal.
+
+    Parameters
+    ----------
+    - n_steps (dict): bar name --> number of steps of the bar. The names are
+      displayed in front of the bars, in this order.
+    - interval (float): time in seconds between renderings
+    - nchars (int): number of characters of the bars
+    - show_rate (bool): display the rate (items/s) and ETA of each bar
+    - stream: where the bars are written (default: `sys.stdout`)
+
+    Examples
+    --------
+    >>> from concurrent.futures import ProcessPoolExecutor
+    >>>
+    >>> def init_worker(files_counter, rows_counter):
+    >>>     global files, rows
+    >>>     files, rows = files_counter, rows_counter
+    >>>
+    >>> def process_file(path):
+    >>>     for row in open(path):
+    >>>         ...
+    >>>         rows.increment()
+    >>>     rows.flush()
+    >>>     files.increment()
+    >>>     files.flush()
+    >>>
+    >>> with ProgressAggregator({'files': len(paths),
+                                'rows': n_rows}) as progress:
+    >>>     initargs = (progress.counter('files', batch_size=1),
+                        progress.counter('rows', batch_size=1000))
+    >>>     with ProcessPoolExecutor(initializer=init_worker,
+                                     initargs=initargs) as executor:
+    >>>         list(executor.map(process_file, paths))
+    """
+
+    def __init__(self, n_steps, interval=0.2, nchars=40, show_rate=False,
+                 stream=None):
+        self.names = list(n_steps)
+        self.interval = interval
+        self.stream = stream
+        self._values = multiprocessing.Array('q', len(self.names))
+        width = max(len(name) for name in self.names) if self.names else 0
+        self._bars = [ProgressBar(message=name.rjust(width), nchars=nchars,
+                                  n_steps=n_steps[name], show_rate=show_rate)
+                      for name in self.names]
+        self._n_lines_drawn = 0
+        self._stop = None
+        self._thread = None
+
+    def counter(self, name, batch_size=100):
+        """
+        New counter of the bar `name`. Each worker thread needs its own counter;
+        worker processes can receive one through the pool initializer.
+        """
+        return ProgressCounter(self._values, self.names.index(name),
+                               batch_size=batch_size)
+
+    @property
+    def values(self):
+        """
+        Current value of each bar (increments not yet flushed are not included).
+        """
+        return dict(zip(self.names, self._values[:]))
+
+    def render(self):
+        """
+        Draw all bars, overwriting the previous drawing.
+        """
+        stream = self.stream or sys.stdout
+        lines = []
+        for bar, value in zip(self._bars, self._values[:]):
+            bar.value = value
+            lines.append(bar.bar_str.lstrip('\r'))
+        up = ('\x1b[{:d}F'.format(self._n_lines_drawn - 1)
+              if self._n_lines_drawn > 1 else '')
+        stream.write(up + '\r' + '\n'.join(lines))
+        stream.flush()
+        self._n_lines_drawn = len(lines)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.render()
+
+    def start(self):
+        """
+        Start drawing the bars in a background thread.
+        """
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the background thread and draw the final state of the bars.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.render()
+        (self.stream or sys.stdout).write('\n')
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()